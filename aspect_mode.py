@@ -0,0 +1,136 @@
+"""
+Native-aspect (portrait) input shape for training, validation and inference.
+
+Replay frames are tall portrait images, so a square 640x640 input is mostly
+padding. This picks one fixed portrait shape from the dataset's own frame
+sizes (read from image headers), e.g. 384x672 for 9:16 frames:
+
+    long side  = --long-side (multiple of the model stride)
+    short side = median aspect ratio * long side, rounded up to the stride
+
+Training uses ultralytics rect batches with imgsz = long side; with fixed-size
+frames the train batch shape is exactly this (H, W). Ultralytics rect val adds
+half a stride of padding on both sides (704x416 for 672x384), so the per-epoch
+val inside training runs one stride taller and wider. Final val/test metrics
+and this benchmark predict at (H, W) explicitly and score through pred_cache.py.
+Note that rect mode disables mosaic augmentation.
+
+Benchmark (square baseline vs aspect mode, FLOPs / throughput / mAP):
+    python aspect_mode.py --benchmark --model runs/detect/towers_bars_finetune/weights/best.pt
+"""
+import argparse
+import math
+import random
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+import yaml
+
+from image_meta import image_size
+
+STRIDE = 32
+
+def list_images(img_dir: Path) -> List[Path]:
+    if img_dir.suffix == '.txt':  # manifest of image paths (mine_hard_examples.py)
+        return [Path(ln) for ln in img_dir.read_text().splitlines() if ln.strip()]
+    return sorted(list(img_dir.rglob('*.png')) + list(img_dir.rglob('*.jpg')))
+
+def portrait_shape(img_dir: Path, long_side: int = 672, sample: int = 256,
+                   stride: int = STRIDE, seed: int = 0) -> Tuple[int, int]:
+    """
+    (H, W) input shape matching the median frame aspect under img_dir.
+    """
+    images = list_images(img_dir)
+    if not images:
+        raise FileNotFoundError(f"No images under {img_dir}")
+    random.seed(seed)
+    if len(images) > sample:
+        images = random.sample(images, sample)
+    sizes = np.array([image_size(p) for p in images], dtype=np.float64)  # (W, H)
+    ratio = float(np.median(np.minimum(sizes[:, 0], sizes[:, 1]) / np.maximum(sizes[:, 0], sizes[:, 1])))
+    short = int(math.ceil(long_side * ratio / stride) * stride)
+    portrait = np.median(sizes[:, 1]) >= np.median(sizes[:, 0])
+    return (long_side, short) if portrait else (short, long_side)
+
+def data_shape(data_yaml: str = 'data.yaml', split: str = 'train', long_side: int = 672) -> Tuple[int, int]:
+    """portrait_shape for a split of a YOLO data.yaml."""
+    data = yaml.safe_load(Path(data_yaml).read_text())
+    return portrait_shape(Path(data['path']) / data[split], long_side)
+
+def padding_fraction(frame_wh: Tuple[int, int], input_hw: Tuple[int, int]) -> float:
+    """Fraction of the input tensor that is letterbox padding."""
+    W, H = frame_wh
+    ih, iw = input_hw
+    r = min(ih / H, iw / W)
+    return 1.0 - (W * r) * (H * r) / (ih * iw)
+
+def benchmark(model_path: str, data_yaml: str, split: str, long_side: int, square: int,
+              n_images: int, batch: int, device, out_dir: str = 'runs/aspect_bench'):
+    from ultralytics import YOLO
+    from ultralytics.utils.torch_utils import get_flops
+
+    from pred_cache import IOU_THRESHOLDS, cache_predictions, evaluate, load_cache, match, mean_ap
+
+    data = yaml.safe_load(Path(data_yaml).read_text())
+    img_dir = Path(data['path']) / data[split]
+    images = list_images(img_dir)[:n_images]
+    shape = portrait_shape(img_dir, long_side)
+    frame_wh = image_size(images[0])
+
+    # predict defaults to rect=True, which would shrink the square letterbox to the
+    # nearest stride multiple; force full padding so FLOPs/img/s/padding agree
+    # mAP comes from the same predict call (shape and rect) that is timed
+    modes = [
+        ('square', [square, square], False),
+        ('aspect', list(shape), True),
+    ]
+    rows = []
+    for name, predict_hw, rect in modes:
+        model = YOLO(model_path)
+        flops = get_flops(model.model, predict_hw)
+        # Warm up, then time batched streaming inference
+        for _ in model.predict(source=images[:batch], imgsz=predict_hw, rect=rect, batch=batch,
+                               device=device, verbose=False, stream=True):
+            pass
+        t0 = time.perf_counter()
+        for _ in model.predict(source=images, imgsz=predict_hw, rect=rect, batch=batch,
+                               device=device, verbose=False, stream=True):
+            pass
+        fps = len(images) / (time.perf_counter() - t0)
+        preds = cache_predictions(model_path, [img_dir], Path(out_dir) / f'{name}_{split}_preds.npz',
+                                  imgsz=predict_hw, batch=batch, device=device, rect=rect)
+        cache = load_cache(preds)
+        map50, map5095 = mean_ap(evaluate(cache, match(cache, IOU_THRESHOLDS)))
+        rows.append((name, f"{predict_hw[0]}x{predict_hw[1]}", flops, fps,
+                     padding_fraction(frame_wh, predict_hw), map50, map5095))
+
+    print(f"\n{'='*78}")
+    print(f"{'mode':<8} {'input HxW':>10} {'GFLOPs':>8} {'img/s':>8} {'padding':>8} {'mAP50':>8} {'mAP50-95':>9}")
+    for name, hw, flops, fps, pad, m50, m in rows:
+        print(f"{name:<8} {hw:>10} {flops:>8.2f} {fps:>8.1f} {pad:>8.1%} {m50:>8.4f} {m:>9.4f}")
+    print(f"{'='*78}")
+    return rows
+
+def main():
+    ap = argparse.ArgumentParser(description="Pick a portrait input shape and benchmark it against square.")
+    ap.add_argument("--data", default="data.yaml")
+    ap.add_argument("--split", default="train", help="Split used for frame statistics (and benchmark val).")
+    ap.add_argument("--long-side", type=int, default=672)
+    ap.add_argument("--benchmark", action="store_true")
+    ap.add_argument("--model", default="runs/detect/towers_bars_finetune/weights/best.pt")
+    ap.add_argument("--square", type=int, default=640, help="Square baseline imgsz.")
+    ap.add_argument("--n-images", type=int, default=512, help="Images timed for throughput.")
+    ap.add_argument("--batch", type=int, default=32)
+    ap.add_argument("--device", default=0)
+    args = ap.parse_args()
+
+    shape = data_shape(args.data, args.split, args.long_side)
+    print(f"[INFO] Portrait input shape (H x W): {shape[0]} x {shape[1]}")
+    if args.benchmark:
+        benchmark(args.model, args.data, 'test' if args.split == 'train' else args.split,
+                  args.long_side, args.square, args.n_images, args.batch, args.device)
+
+if __name__ == '__main__':
+    main()
@@ -2,11 +2,14 @@
 Generate YOLO labels for all images using the ROIs from rois.json.
 Creates labels for king and princess towers across all arena/game folders.
 """
+import argparse
 import json
 import os
 from pathlib import Path
 from typing import Dict, List, Tuple
 
+from sharding import add_shard_arg, game_key, in_shard, write_counters
+
 # Class mapping
 CLASS_MAP = {
     'king': 0,
@@ -59,8 +62,14 @@ def create_label_file(image_path: Path, rois: Dict, labels_dir: Path):
             f.write('\n'.join(boxes) + '\n')
 
 def main():
+    ap = argparse.ArgumentParser(description="Write YOLO tower labels from ROIs.")
+    ap.add_argument("--root", default="/home/ostikar/MyProjects/CS541/ClashRoyale/data",
+                    help="Data root containing arena_* folders.")
+    add_shard_arg(ap)
+    args = ap.parse_args()
+
     # Paths
-    data_root = Path('/home/ostikar/MyProjects/CS541/ClashRoyale/data')
+    data_root = Path(args.root)
     rois_json = data_root / 'towers' / 'rois.json'
     
     # Load ROIs
@@ -86,9 +95,18 @@ def main():
     # Process each arena
     for arena_dir in arena_dirs:
         print(f"\nProcessing {arena_dir.name}...")
+
+        # Prefer per-arena ROIs from calibrate_rois.py when available
+        arena_rois = rois
+        arena_rois_json = arena_dir / 'rois.json'
+        if arena_rois_json.exists():
+            with open(arena_rois_json, 'r') as f:
+                arena_rois = json.load(f)
+            print(f"  Using calibrated ROIs from {arena_rois_json}")
         
         # Find all game directories
-        game_dirs = sorted([d for d in arena_dir.iterdir() if d.is_dir() and d.name.startswith('game_')])
+        game_dirs = sorted([d for d in arena_dir.iterdir() if d.is_dir() and d.name.startswith('game_')
+                            and in_shard(game_key(d), args.shard)])
         
         for game_dir in game_dirs:
             images_dir = game_dir / 'images'
@@ -103,7 +121,7 @@ def main():
             image_files = sorted(images_dir.glob('*.png')) + sorted(images_dir.glob('*.jpg'))
             
             for img_path in image_files:
-                create_label_file(img_path, rois, labels_dir)
+                create_label_file(img_path, arena_rois, labels_dir)
                 total_labels += 1
             
             total_images += len(image_files)
@@ -115,6 +133,8 @@ def main():
     print(f"Total images found: {total_images}")
     print(f"Total label files created: {total_labels}")
     print(f"{'='*60}")
+    if args.shard[1] > 1:
+        write_counters('autolabel', args.shard, {'images': total_images, 'labels': total_labels})
     print(f"\nNext steps:")
     print(f"1. Run split_yolo_dataset.py to create train/val/test splits")
     print(f"2. Update data.yaml to point to the split directories")
@@ -2,10 +2,13 @@
 Append health_bar labels from bar_rois.json to existing YOLO labels.
 Skips king bars when JSON has null (not visible at full health).
 """
+import argparse
 import json
 from pathlib import Path
 from typing import List, Tuple
 
+from sharding import add_shard_arg, game_key, in_shard, write_counters
+
 HEALTH_BAR_CLASS_ID = 4  # Update if your data.yaml maps differently
 
 def roi_to_yolo(roi: List[float]) -> Tuple[float, float, float, float]:
@@ -17,7 +20,13 @@ def roi_to_yolo(roi: List[float]) -> Tuple[float, float, float, float]:
     return xc, yc, w, h
 
 def main():
-    data_root = Path('/home/ostikar/MyProjects/CS541/ClashRoyale/data')
+    ap = argparse.ArgumentParser(description="Append health_bar labels from bar_rois.json.")
+    ap.add_argument("--root", default="/home/ostikar/MyProjects/CS541/ClashRoyale/data",
+                    help="Data root containing arena_* folders.")
+    add_shard_arg(ap)
+    args = ap.parse_args()
+
+    data_root = Path(args.root)
     bar_json = data_root / 'towers3cls' / 'bar_rois.json'
 
     with open(bar_json, 'r') as f:
@@ -38,7 +47,13 @@ def main():
     for arena in arenas:
         if not arena.exists():
             continue
+        # Prefer per-arena bar ROIs from calibrate_rois.py when available
+        arena_bars = bar_rois
+        if (arena / 'bar_rois.json').exists():
+            arena_bars = json.loads((arena / 'bar_rois.json').read_text())
         for game_dir in sorted([d for d in arena.iterdir() if d.is_dir() and d.name.startswith('game_')]):
+            if not in_shard(game_key(game_dir), args.shard):
+                continue
             images_dir = game_dir / 'images'
             labels_dir = game_dir / 'labels'
             if not images_dir.exists():
@@ -55,7 +70,7 @@ def main():
 
                 # Append bar boxes for the towers that have them defined
                 for k in keys:
-                    roi = bar_rois.get(k, None)
+                    roi = arena_bars.get(k, None)
                     if not roi:
                         continue  # skip null or missing (e.g., king bars)
                     xc, yc, w, h = roi_to_yolo(roi)
@@ -71,6 +86,8 @@ def main():
     print(f"Processed images: {total_images}")
     print(f"Health bar labels appended: {added}")
     print("Done. Re-run your split to refresh the consolidated dataset.")
+    if args.shard[1] > 1:
+        write_counters('autolabel_bars', args.shard, {'images': total_images, 'added': added})
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,237 @@
+"""
+Calibrate tower and health-bar ROIs per arena without drawing boxes.
+
+Templates are cut from one reference frame using the hand-drawn rois.json
+(and bar_rois.json). For every arena/game a sample of frames is matched with
+a two-level pyramid search: a coarse cv2.matchTemplate on a downsampled frame
+(OpenCV switches to DFT-based correlation for large inputs) followed by a
+full-resolution refinement around the coarse hit. The per-frame boxes are
+reduced with a median, and the median match score is kept as confidence.
+
+Health bars change colour and length during a game, so they are not matched
+directly: each bar keeps its reference offset from its own tower.
+
+Outputs per arena (same formats as the existing loaders expect):
+    arena_xx/rois.json         tower ROIs (normalized x1, y1, x2, y2)
+    arena_xx/bar_rois.json     health-bar ROIs
+    arena_xx/calibration.json  confidence per ROI and per-game details
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+TOWER_KEYS = ['king_top', 'king_bottom',
+              'princess_top_l', 'princess_top_r',
+              'princess_bot_l', 'princess_bot_r']
+
+# Shared with workers through the pool initializer
+_REF = {}
+
+def is_degenerate(roi: Optional[List[float]]) -> bool:
+    return not roi or roi[2] <= roi[0] or roi[3] <= roi[1]
+
+def load_gray(path: Path, size: Tuple[int, int]) -> Optional[np.ndarray]:
+    """Read a frame as grayscale, resized to the reference (W, H)."""
+    img = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        return None
+    if (img.shape[1], img.shape[0]) != size:
+        img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+    return img
+
+def build_templates(ref_image: Path, rois: Dict[str, List[float]]):
+    """Crop one grayscale template per non-degenerate tower ROI."""
+    img = cv2.imread(str(ref_image), cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        raise FileNotFoundError(f"Could not read reference image: {ref_image}")
+    H, W = img.shape[:2]
+    templates = {}
+    for name in TOWER_KEYS:
+        roi = rois.get(name)
+        if is_degenerate(roi):
+            print(f"[WARN] Reference ROI '{name}' is empty, it will not be calibrated")
+            continue
+        x1, y1 = int(roi[0] * W), int(roi[1] * H)
+        x2, y2 = int(roi[2] * W), int(roi[3] * H)
+        templates[name] = (img[y1:y2, x1:x2].copy(), (x1, y1))
+    return templates, (W, H)
+
+def _init_worker(templates, size, scale, margin):
+    _REF.update(templates=templates, size=size, scale=scale, margin=margin)
+
+def match_pyramid(frame: np.ndarray, tmpl: np.ndarray, ref_xy: Tuple[int, int],
+                  scale: float, margin: float) -> Tuple[int, int, float]:
+    """
+    Locate tmpl in frame near ref_xy. Returns (x, y, score) at full resolution.
+    """
+    H, W = frame.shape[:2]
+    th, tw = tmpl.shape[:2]
+    mx, my = int(W * margin), int(H * margin)
+    sx1, sy1 = max(0, ref_xy[0] - mx), max(0, ref_xy[1] - my)
+    sx2, sy2 = min(W, ref_xy[0] + tw + mx), min(H, ref_xy[1] + th + my)
+    region = frame[sy1:sy2, sx1:sx2]
+
+    # Coarse level
+    small = cv2.resize(region, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    small_t = cv2.resize(tmpl, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    if small_t.shape[0] < 4 or small_t.shape[1] < 4 or \
+            small.shape[0] < small_t.shape[0] or small.shape[1] < small_t.shape[1]:
+        small, small_t, scale = region, tmpl, 1.0
+    res = cv2.matchTemplate(small, small_t, cv2.TM_CCOEFF_NORMED)
+    _, _, _, (cx, cy) = cv2.minMaxLoc(res)
+    cx, cy = int(cx / scale), int(cy / scale)
+
+    # Refinement at full resolution
+    pad = int(np.ceil(2 / scale))
+    rx1, ry1 = max(0, cx - pad), max(0, cy - pad)
+    rx2 = min(region.shape[1], cx + tw + pad)
+    ry2 = min(region.shape[0], cy + th + pad)
+    res = cv2.matchTemplate(region[ry1:ry2, rx1:rx2], tmpl, cv2.TM_CCOEFF_NORMED)
+    _, score, _, (fx, fy) = cv2.minMaxLoc(res)
+    return sx1 + rx1 + fx, sy1 + ry1 + fy, float(score)
+
+def sample_frames(images_dir: Path, n: int) -> List[Path]:
+    frames = sorted(images_dir.glob('*.png')) + sorted(images_dir.glob('*.jpg'))
+    if len(frames) <= n:
+        return frames
+    idx = np.linspace(0, len(frames) - 1, n).round().astype(int)
+    return [frames[i] for i in idx]
+
+def calibrate_game(game_dir: Path, n_samples: int):
+    """
+    Worker: median box and score per tower ROI over sampled frames of a game.
+    """
+    templates, size = _REF['templates'], _REF['size']
+    W, H = size
+    hits = {name: [] for name in templates}
+    for path in sample_frames(game_dir / 'images', n_samples):
+        frame = load_gray(path, size)
+        if frame is None:
+            continue
+        for name, (tmpl, ref_xy) in templates.items():
+            x, y, score = match_pyramid(frame, tmpl, ref_xy, _REF['scale'], _REF['margin'])
+            hits[name].append((x, y, score))
+
+    result = {}
+    for name, rows in hits.items():
+        if not rows:
+            continue
+        arr = np.array(rows, dtype=np.float64)
+        x, y = np.median(arr[:, 0]), np.median(arr[:, 1])
+        th, tw = templates[name][0].shape[:2]
+        result[name] = {
+            'roi': [x / W, y / H, (x + tw) / W, (y + th) / H],
+            'confidence': float(np.median(arr[:, 2])),
+            'frames': len(rows),
+        }
+    return game_dir, result
+
+def place_bars(rois: Dict[str, List[float]], ref_rois: Dict[str, List[float]],
+               ref_bars: Dict[str, Optional[List[float]]]) -> Dict[str, Optional[List[float]]]:
+    """Move each bar by the displacement of its tower from the reference."""
+    bars = {}
+    for key, bar in ref_bars.items():
+        tower = key[:-len('_bar')] if key.endswith('_bar') else None
+        if not bar or tower not in rois or is_degenerate(ref_rois.get(tower)):
+            bars[key] = bar
+            continue
+        dx = rois[tower][0] - ref_rois[tower][0]
+        dy = rois[tower][1] - ref_rois[tower][1]
+        bars[key] = [bar[0] + dx, bar[1] + dy, bar[2] + dx, bar[3] + dy]
+    return bars
+
+def find_games(data_root: Path, arenas: Optional[List[str]]) -> List[Path]:
+    names = arenas or [f'arena_{i:02d}' for i in range(1, 11)]
+    games = []
+    for name in names:
+        arena_dir = data_root / name
+        if not arena_dir.exists():
+            continue
+        games.extend(sorted(d for d in arena_dir.iterdir()
+                            if d.is_dir() and d.name.startswith('game_') and (d / 'images').exists()))
+    return games
+
+def main():
+    ap = argparse.ArgumentParser(description="Calibrate per-arena tower/bar ROIs by template matching.")
+    ap.add_argument("--root", default="/home/ostikar/MyProjects/CS541/ClashRoyale/data",
+                    help="Data root containing arena_* folders.")
+    ap.add_argument("--ref-image", default=None,
+                    help="Reference frame the ROIs were drawn on (default: first arena_02/game_01 frame).")
+    ap.add_argument("--rois", default=None, help="Reference tower rois.json (default: <root>/towers/rois.json).")
+    ap.add_argument("--bar-rois", default=None,
+                    help="Reference bar_rois.json (default: <root>/towers3cls/bar_rois.json, optional).")
+    ap.add_argument("--arenas", nargs="+", default=None, help="Arena folders to calibrate (default: 01-10).")
+    ap.add_argument("--samples", type=int, default=16, help="Frames sampled per game.")
+    ap.add_argument("--scale", type=float, default=0.25, help="Downsample factor for the coarse search.")
+    ap.add_argument("--margin", type=float, default=0.08,
+                    help="Search window around the reference box, as a fraction of frame size.")
+    ap.add_argument("--workers", type=int, default=os.cpu_count(), help="Process pool size.")
+    args = ap.parse_args()
+
+    root = Path(args.root)
+    rois_path = Path(args.rois) if args.rois else root / 'towers' / 'rois.json'
+    bars_path = Path(args.bar_rois) if args.bar_rois else root / 'towers3cls' / 'bar_rois.json'
+    ref_rois = json.loads(rois_path.read_text())
+    ref_bars = json.loads(bars_path.read_text()) if bars_path.exists() else {}
+
+    if args.ref_image:
+        ref_image = Path(args.ref_image)
+    else:
+        ref_frames = sample_frames(root / 'arena_02' / 'game_01' / 'images', 1)
+        if not ref_frames:
+            print("[ERROR] No reference image found, pass --ref-image")
+            return
+        ref_image = ref_frames[0]
+
+    templates, size = build_templates(ref_image, ref_rois)
+    games = find_games(root, args.arenas)
+    print(f"[INFO] Reference: {ref_image} ({size[0]}x{size[1]}), {len(templates)} templates")
+    print(f"[INFO] Calibrating {len(games)} games with {args.workers} workers")
+
+    per_arena = {}
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(templates, size, args.scale, args.margin)) as pool:
+        futures = [pool.submit(calibrate_game, g, args.samples) for g in games]
+        for fut in as_completed(futures):
+            game_dir, result = fut.result()
+            per_arena.setdefault(game_dir.parent, {})[game_dir.name] = result
+
+    for arena_dir in sorted(per_arena):
+        games_res = per_arena[arena_dir]
+        rois, confidence = {}, {}
+        for name in templates:
+            found = [g[name] for g in games_res.values() if name in g]
+            if not found:
+                continue
+            boxes = np.array([f['roi'] for f in found])
+            rois[name] = [float(v) for v in np.median(boxes, axis=0)]
+            confidence[name] = float(np.median([f['confidence'] for f in found]))
+        bars = place_bars(rois, ref_rois, ref_bars)
+        for key, bar in bars.items():
+            tower = key[:-len('_bar')] if key.endswith('_bar') else key
+            if bar and tower in confidence:
+                confidence[key] = confidence[tower]
+
+        (arena_dir / 'rois.json').write_text(json.dumps(rois, indent=2))
+        if bars:
+            (arena_dir / 'bar_rois.json').write_text(json.dumps(bars, indent=2))
+        (arena_dir / 'calibration.json').write_text(json.dumps({
+            'reference_image': str(ref_image),
+            'confidence': confidence,
+            'games': games_res,
+        }, indent=2))
+
+        worst = min(confidence.items(), key=lambda kv: kv[1]) if confidence else ('-', 0.0)
+        print(f"  {arena_dir.name}: {len(games_res)} games, {len(rois)} ROIs, "
+              f"lowest confidence {worst[0]}={worst[1]:.3f}")
+
+    print(f"[DONE] Wrote rois.json / bar_rois.json / calibration.json for {len(per_arena)} arenas")
+
+if __name__ == '__main__':
+    main()
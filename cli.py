@@ -0,0 +1,99 @@
+"""
+Single entry point for the pipeline scripts.
+
+    python cli.py [--config config.yaml] <command> [script args...]
+
+Commands (each runs the script's own main() with its own flags):
+
+    download    download_data.py        --out <hf_root>
+    extract     extract_parquet_png.py  --root <hf_root>
+    label       autolabel.py            --root <data_root>
+    label-bars  autolabel_bars.py       --root <data_root>
+    clean       data_cleaner.py         --root <data_root>
+    split       split_data.py           --data-root <data_root> --out <dataset_dir>
+    train       tower_run.py            --data <data_yaml> --weights <train_weights> --wandb-project ...
+    infer       inference.py            --model <infer_weights>
+    visualize   visualize_dataset.py    --root <data_root>
+
+Values come from the shared config file; anything passed after the command is
+appended, so it overrides the config. The script module (and with it cv2,
+pyarrow, ultralytics, wandb, ...) is only imported once the command is known,
+and the startup / import time is reported on stderr, e.g.
+
+    python cli.py extract --dry-run
+    python cli.py infer --root-mode --source /data --shard 0/4
+"""
+import time
+
+_T0 = time.perf_counter()
+
+import argparse
+import importlib
+import sys
+from pathlib import Path
+
+DEFAULT_CONFIG = Path(__file__).with_name("config.yaml")
+
+# command -> (module, entry function, {flag: config key}, help)
+COMMANDS = {
+    "download": ("download_data", "main", {"--out": "hf_root"},
+                 "Download frames.parquet games from the Hub."),
+    "extract": ("extract_parquet_png", "main", {"--root": "hf_root"},
+                "Extract frames from the downloaded parquets."),
+    "label": ("autolabel", "main", {"--root": "data_root"},
+              "Write tower labels from the ROIs."),
+    "label-bars": ("autolabel_bars", "main", {"--root": "data_root"},
+                   "Add health bar labels."),
+    "clean": ("data_cleaner", "main", {"--root": "data_root"},
+              "Remove health_bar labels where no bar is visible."),
+    "split": ("split_data", "main", {"--data-root": "data_root", "--out": "dataset_dir"},
+              "Split labelled games into train/val/test."),
+    "train": ("tower_run", "main", {"--data": "data_yaml", "--weights": "train_weights",
+                                    "--wandb-project": "wandb_project"},
+              "Fine-tune the detector."),
+    "infer": ("inference", "main", {"--model": "infer_weights"},
+              "Run the detector and save annotated images."),
+    "visualize": ("visualize_dataset", "cli", {"--root": "data_root"},
+                  "Render labels/predictions to images, a video or a grid."),
+}
+
+def load_config(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    import yaml
+    return yaml.safe_load(path.read_text()) or {}
+
+def config_args(flags: dict, config: dict) -> list:
+    argv = []
+    for flag, key in flags.items():
+        if config.get(key) is not None:
+            argv += [flag, str(config[key])]
+    return argv
+
+def main(argv=None):
+    commands = "\n".join(f"  {name:<11} {c[3]}" for name, c in COMMANDS.items())
+    ap = argparse.ArgumentParser(
+        description="Clash Royale tower detection pipeline.",
+        epilog=f"commands:\n{commands}\n\nRun '<command> --help' for the command's own flags.",
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--config", default=str(DEFAULT_CONFIG), help="Shared config file.")
+    ap.add_argument("command", choices=list(COMMANDS), metavar="command", help="See below.")
+    ap.add_argument("args", nargs=argparse.REMAINDER, help="Arguments for the command.")
+    args = ap.parse_args(argv)
+
+    module_name, func, flags, _ = COMMANDS[args.command]
+    config = load_config(Path(args.config))
+    cmd_argv = config_args(flags, config) + args.args
+    t_start = time.perf_counter()
+
+    module = importlib.import_module(module_name)
+    t_import = time.perf_counter()
+    print(f"[TIME] startup {1000 * (t_start - _T0):.0f} ms, import {module_name} "
+          f"{1000 * (t_import - t_start):.0f} ms", file=sys.stderr)
+
+    sys.argv = [f"cli.py {args.command}"] + cmd_argv
+    getattr(module, func)()
+    print(f"[TIME] {args.command} finished after {time.perf_counter() - _T0:.1f} s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
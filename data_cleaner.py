@@ -2,10 +2,11 @@
 Remove false health_bar labels from YOLO txts when the bar isn't visible.
 Heuristic: HSV color segmentation (green/yellow/red) + horizontal fill check.
 """
-import cv2
-import numpy as np
+import argparse
 from pathlib import Path
 
+from sharding import add_shard_arg, game_key, in_shard, write_counters
+
 HEALTH_BAR_CLASS_ID = 4  # adjust if needed
 
 def yolo_to_xyxy(line, w, h):
@@ -18,11 +19,53 @@ def yolo_to_xyxy(line, w, h):
     x2, y2 = min(w-1, x2), min(h-1, y2)
     return cls, x1, y1, x2, y2
 
-def bar_present(bar_roi: np.ndarray, min_col_fill=0.30, min_run_frac=0.20) -> bool:
+def bar_color_mask(hsv: "np.ndarray") -> "np.ndarray":
+    """
+    Bar-colored pixels (green/yellow/red) of an HSV image or stack of images.
+    Same thresholds as cv2.inRange below, as numpy comparisons so any leading
+    batch dimensions work.
+    """
+    h, s, v = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+    green = (h >= 35) & (h <= 85) & (s >= 40) & (v >= 40)
+    yellow = (h >= 20) & (h <= 35) & (s >= 70) & (v >= 70)
+    red = ((h <= 10) | ((h >= 170) & (h <= 180))) & (s >= 70) & (v >= 70)
+    return green | yellow | red
+
+def longest_runs(filled: "np.ndarray") -> "np.ndarray":
+    """Longest run of True along the last axis, vectorized over the others."""
+    import numpy as np
+
+    f = filled.astype(np.int32)
+    c = np.cumsum(f, axis=-1)
+    reset = np.maximum.accumulate(np.where(f == 0, c, 0), axis=-1)
+    return (c - reset).max(axis=-1) if f.shape[-1] else np.zeros(f.shape[:-1], dtype=np.int32)
+
+def bar_fill_batch(bar_rois: "np.ndarray", min_col_fill=0.30, min_run_frac=0.20):
+    """
+    bar_rois: (N, h, w, 3) BGR crops of one bar ROI across N frames.
+    Returns (fill, present): fraction of filled columns (a health estimate)
+    and the bar_present decision, both of shape (N,).
+    """
+    import cv2
+    import numpy as np
+
+    n, h, w = bar_rois.shape[:3]
+    if h == 0 or w == 0:
+        return np.zeros(n), np.zeros(n, dtype=bool)
+    hsv = cv2.cvtColor(bar_rois.reshape(n * h, w, 3), cv2.COLOR_BGR2HSV).reshape(n, h, w, 3)
+    col_sums = bar_color_mask(hsv).sum(axis=1)
+    filled = col_sums >= h * min_col_fill
+    present = longest_runs(filled) >= int(w * min_run_frac)
+    return filled.mean(axis=1), present
+
+def bar_present(bar_roi: "np.ndarray", min_col_fill=0.30, min_run_frac=0.20) -> bool:
     """
     min_col_fill: a column counts as 'filled' if >=30% pixels are bar-colored
     min_run_frac: require a continuous filled run >=20% of ROI width
     """
+    import cv2
+    import numpy as np
+
     if bar_roi.size == 0: return False
     hsv = cv2.cvtColor(bar_roi, cv2.COLOR_BGR2HSV)
 
@@ -39,18 +82,14 @@ def bar_present(bar_roi: np.ndarray, min_col_fill=0.30, min_run_frac=0.20) -> bo
     col_sums = np.sum(mask > 0, axis=0)
     filled = (col_sums >= h * min_col_fill)
 
-    # longest continuous run of True
-    run, best = 0, 0
-    for v in filled:
-        run = run + 1 if v else 0
-        best = max(best, run)
-
-    return best >= int(w * min_run_frac)
+    return int(longest_runs(filled)) >= int(w * min_run_frac)
 
 def process_image(img_path: Path, lbl_path: Path) -> int:
     """
     Returns number of bar labels removed for this image.
     """
+    import cv2
+
     if not lbl_path.exists():
         return 0
     image = cv2.imread(str(img_path))
@@ -86,13 +125,20 @@ def process_image(img_path: Path, lbl_path: Path) -> int:
     return removed
 
 def main():
-    root = Path('/home/ostikar/MyProjects/CS541/ClashRoyale/data')
+    ap = argparse.ArgumentParser(description="Remove health_bar labels where no bar is visible.")
+    ap.add_argument("--root", default="/home/ostikar/MyProjects/CS541/ClashRoyale/data",
+                    help="Data root containing arena_* folders.")
+    add_shard_arg(ap)
+    args = ap.parse_args()
+
+    root = Path(args.root)
     arenas = [root / f'arena_{i:02d}' for i in range(1, 11)]
     total_imgs, total_removed = 0, 0
 
     for arena in arenas:
         if not arena.exists(): continue
         for game in sorted([d for d in arena.iterdir() if d.is_dir() and d.name.startswith('game_')]):
+            if not in_shard(game_key(game), args.shard): continue
             images = (game / 'images')
             labels = (game / 'labels')
             if not images.exists() or not labels.exists(): continue
@@ -105,6 +151,8 @@ def main():
     print(f'Checked images: {total_imgs}')
     print(f'Removed false health_bar labels: {total_removed}')
     print('Done. Re-run your split and train.')
+    if args.shard[1] > 1:
+        write_counters('data_cleaner', args.shard, {'images': total_imgs, 'removed': total_removed})
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
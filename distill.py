@@ -0,0 +1,193 @@
+"""
+Distill the tower detector into smaller students and pick the fastest one
+that stays within a mAP tolerance of the teacher.
+
+1. The teacher (current best.pt) labels the train split; its detections
+   (conf >= --teacher-conf) become the students' training targets. Val/test
+   keep the ground-truth labels, so every model is scored the same way.
+2. Each student is a YOLO11 detect model built from yolo11n.yaml with a
+   reduced width/depth multiple, trained from scratch at its own imgsz.
+3. Teacher and students are evaluated on the test split (mAP per class) and
+   timed on CPU (batch-1 latency and batched throughput).
+
+The report (<out>/selection.json and a table on stdout) marks the fastest
+candidate whose mAP50-95 is within --tolerance of the teacher.
+
+Usage:
+    python distill.py --teacher runs/detect/towers_bars_finetune/weights/best.pt \\
+        --candidates 0.25:0.50:640 0.125:0.33:480 0.125:0.33:320 --epochs 30
+"""
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import yaml
+
+def parse_candidate(value: str) -> Tuple[float, float, int]:
+    """'width:depth:imgsz' -> (width, depth, imgsz)."""
+    try:
+        w, d, s = value.split(':')
+        return float(w), float(d), int(s)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected width:depth:imgsz, got '{value}'")
+
+def teacher_dataset(teacher: str, data_yaml: str, out_dir: Path, conf: float, imgsz: int,
+                    batch: int, device) -> Path:
+    """Train split relabelled by the teacher (images hard-linked), val/test unchanged."""
+    from ultralytics import YOLO
+
+    data = yaml.safe_load(Path(data_yaml).read_text())
+    base = Path(data['path'])
+    src_images = base / data['train']
+    img_out = out_dir / 'train' / 'images'
+    lbl_out = out_dir / 'train' / 'labels'
+    img_out.mkdir(parents=True, exist_ok=True)
+    lbl_out.mkdir(parents=True, exist_ok=True)
+
+    model = YOLO(teacher)
+    images = sorted(list(src_images.glob('*.png')) + list(src_images.glob('*.jpg')))
+    for r in model.predict(source=[str(p) for p in images], conf=conf, imgsz=imgsz, batch=batch,
+                           device=device, stream=True, verbose=False):
+        src = Path(r.path)
+        dst = img_out / src.name
+        if not dst.exists():
+            try:
+                os.link(src, dst)
+            except OSError:
+                dst.symlink_to(src)
+        cls = r.boxes.cls.cpu().numpy().astype(int)
+        xywhn = r.boxes.xywhn.cpu().numpy()
+        (lbl_out / f'{src.stem}.txt').write_text(
+            ''.join(f"{c} {x:.6f} {y:.6f} {w:.6f} {h:.6f}\n" for c, (x, y, w, h) in zip(cls, xywhn)))
+
+    distill_yaml = out_dir / 'distill_data.yaml'
+    distill_yaml.write_text(yaml.safe_dump({
+        'path': str(out_dir),
+        'train': 'train/images',
+        'val': str(base / data['val']),
+        'test': str(base / data['test']),
+        'names': data['names'],
+    }, sort_keys=False))
+    return distill_yaml
+
+def student_cfg(width: float, depth: float, nc: int, out_dir: Path) -> Path:
+    """yolo11n.yaml with explicit width/depth multiples instead of named scales."""
+    from ultralytics.nn.tasks import yaml_model_load
+
+    cfg = yaml_model_load('yolo11n.yaml')
+    for k in ('scales', 'scale', 'yaml_file'):
+        cfg.pop(k, None)
+    cfg.update(nc=nc, depth_multiple=depth, width_multiple=width, max_channels=1024)
+    path = out_dir / f'yolo11_w{width:g}_d{depth:g}.yaml'
+    path.write_text(yaml.safe_dump(cfg, sort_keys=False))
+    return path
+
+def cpu_speed(weights: str, images: List[str], imgsz: int, n_latency: int = 50,
+              batch: int = 16) -> Tuple[float, float]:
+    """(batch-1 latency ms, batched images/s) on CPU."""
+    from ultralytics import YOLO
+
+    model = YOLO(weights)
+    model.predict(images[0], imgsz=imgsz, device='cpu', verbose=False)  # warm up
+    sample = images[:n_latency]
+    t0 = time.perf_counter()
+    for p in sample:
+        model.predict(p, imgsz=imgsz, device='cpu', verbose=False)
+    latency = 1000 * (time.perf_counter() - t0) / len(sample)
+    sample = images[:batch * 4]
+    t0 = time.perf_counter()
+    for _ in model.predict(sample, imgsz=imgsz, batch=batch, device='cpu', verbose=False, stream=True):
+        pass
+    return latency, len(sample) / (time.perf_counter() - t0)
+
+def evaluate(weights: str, data_yaml: str, imgsz: int, batch: int, device) -> Dict:
+    from ultralytics import YOLO
+
+    metrics = YOLO(weights).val(data=data_yaml, split='test', imgsz=imgsz, batch=batch,
+                                device=device, plots=False, verbose=False)
+    per_class = {}
+    for i, c in enumerate(metrics.box.ap_class_index):
+        _, _, ap50, ap = metrics.box.class_result(i)
+        per_class[metrics.names[int(c)]] = {'map50': float(ap50), 'map': float(ap)}
+    return {'map50': float(metrics.box.map50), 'map': float(metrics.box.map), 'per_class': per_class}
+
+def main():
+    ap = argparse.ArgumentParser(description="Distill into smaller students and select by speed/mAP.")
+    ap.add_argument("--teacher", default="runs/detect/towers_bars_finetune/weights/best.pt")
+    ap.add_argument("--data", default="data.yaml")
+    ap.add_argument("--candidates", nargs="+", type=parse_candidate,
+                    default=[(0.25, 0.50, 640), (0.25, 0.50, 480), (0.125, 0.33, 480), (0.125, 0.33, 320)],
+                    help="Students as width:depth:imgsz (yolo11n is 0.25:0.50).")
+    ap.add_argument("--teacher-imgsz", type=int, default=640)
+    ap.add_argument("--teacher-conf", type=float, default=0.25)
+    ap.add_argument("--epochs", type=int, default=30)
+    ap.add_argument("--batch", type=int, default=64)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--device", default=0)
+    ap.add_argument("--tolerance", type=float, default=0.01, help="Allowed mAP50-95 drop vs the teacher.")
+    ap.add_argument("--out", default="runs/distill")
+    ap.add_argument("--skip-train", action="store_true", help="Only (re)build the report from trained students.")
+    args = ap.parse_args()
+
+    from ultralytics import YOLO
+
+    out_dir = Path(args.out).resolve()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    data = yaml.safe_load(Path(args.data).read_text())
+    test_dir = Path(data['path']) / data['test']
+    test_images = [str(p) for p in sorted(list(test_dir.glob('*.png')) + list(test_dir.glob('*.jpg')))]
+
+    distill_yaml = out_dir / 'distill_data.yaml'
+    if not args.skip_train:
+        distill_yaml = teacher_dataset(args.teacher, args.data, out_dir, args.teacher_conf,
+                                       args.teacher_imgsz, args.batch, args.device)
+        print(f"[INFO] Teacher-labelled dataset: {distill_yaml}")
+
+    rows = []
+    teacher_latency, teacher_ips = cpu_speed(args.teacher, test_images, args.teacher_imgsz)
+    rows.append({'name': 'teacher', 'weights': args.teacher, 'imgsz': args.teacher_imgsz,
+                 **evaluate(args.teacher, args.data, args.teacher_imgsz, args.batch, args.device),
+                 'cpu_latency_ms': teacher_latency, 'cpu_img_s': teacher_ips})
+
+    for width, depth, imgsz in args.candidates:
+        name = f'student_w{width:g}_d{depth:g}_{imgsz}'
+        weights = out_dir / name / 'weights' / 'best.pt'
+        if not args.skip_train:
+            cfg = student_cfg(width, depth, len(data['names']), out_dir)
+            YOLO(str(cfg)).train(data=str(distill_yaml), epochs=args.epochs, imgsz=imgsz, batch=args.batch,
+                                 workers=args.workers, device=args.device, project=str(out_dir), name=name,
+                                 exist_ok=True, fliplr=0.0, degrees=0.0, plots=False)
+        if not weights.exists():
+            print(f"[WARN] No weights for {name}, skipping")
+            continue
+        latency, ips = cpu_speed(str(weights), test_images, imgsz)
+        rows.append({'name': name, 'weights': str(weights), 'imgsz': imgsz,
+                     **evaluate(str(weights), args.data, imgsz, args.batch, args.device),
+                     'cpu_latency_ms': latency, 'cpu_img_s': ips})
+
+    floor = rows[0]['map'] - args.tolerance
+    eligible = [r for r in rows if r['map'] >= floor]
+    best = min(eligible, key=lambda r: r['cpu_latency_ms'])
+    class_names = [data['names'][i] for i in sorted(data['names'])]
+
+    print(f"\n{'='*60}")
+    header = f"{'model':<28} {'imgsz':>5} {'ms/img':>7} {'img/s':>7} {'mAP50':>7} {'mAP':>7}"
+    header += ''.join(f" {n[:10]:>10}" for n in class_names)
+    print(header)
+    for r in rows:
+        line = (f"{r['name']:<28} {r['imgsz']:>5} {r['cpu_latency_ms']:>7.1f} {r['cpu_img_s']:>7.1f} "
+                f"{r['map50']:>7.4f} {r['map']:>7.4f}")
+        line += ''.join(f" {r['per_class'][n]['map50']:>10.4f}" if n in r['per_class'] else f" {'-':>10}"
+                        for n in class_names)
+        print(line + ('  <- selected' if r is best else ''))
+    print(f"\nSelected: {best['name']} (mAP50-95 floor {floor:.4f}, tolerance {args.tolerance})")
+    print(f"{'='*60}")
+
+    (out_dir / 'selection.json').write_text(json.dumps({
+        'tolerance': args.tolerance, 'selected': best['name'], 'candidates': rows}, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -2,12 +2,13 @@ import random
 import argparse
 from pathlib import Path
 from typing import Dict, List, Tuple
-from huggingface_hub import list_repo_files, hf_hub_download
 
 DATASET_ID = "chrisrca/clash-royale-tv-replays"
 
 # by_arena: {"arena_02": [(game_uuid, "arena_02/<uuid>/frames.parquet"), ...], ...}
 def discover_frames(dataset_id: str) -> Dict[str, List[Tuple[str, str]]]:
+    from huggingface_hub import list_repo_files
+
     files = list_repo_files(dataset_id, repo_type="dataset")
     frame_paths = [f for f in files if f.endswith("frames.parquet")]
     by_arena = {}
@@ -44,6 +45,8 @@ def download_selected(dataset_id: str,
                       selection: List[Tuple[str, str, str]],
                       out_dir: Path,
                       overwrite: bool = False) -> None:
+    from huggingface_hub import hf_hub_download
+
     out_dir.mkdir(parents=True, exist_ok=True)
     for arena, game_folder, repo_path in selection:
         local_game_dir = out_dir / arena / game_folder
@@ -69,6 +72,9 @@ def main():
     ap.add_argument("--seed", type=int, default=42)
     ap.add_argument("--out", default="/home/ostikar/MyProjects/CS541/ClashRoyale/hf_subset")
     ap.add_argument("--overwrite", action="store_true")
+    ap.add_argument("--repack", action="store_true",
+                    help="Rewrite downloaded files for random access (see repack_parquet.py)")
+    ap.add_argument("--rows-per-group", type=int, default=64)
     args = ap.parse_args()
 
     by_arena = discover_frames(args.dataset)
@@ -87,6 +93,12 @@ def main():
     print(f"[INFO] Total files to download: {len(selection)}")
 
     download_selected(args.dataset, selection, Path(args.out), overwrite=args.overwrite)
+    if args.repack:
+        from repack_parquet import repack_one
+        for arena, game_folder, _ in selection:
+            target = Path(args.out) / arena / game_folder / "frames.parquet"
+            n = repack_one(target, rows_per_group=args.rows_per_group, replace=True)
+            print(f"[REPACK] {target}: {n} frames")
     print("[DONE]")
 
 if __name__ == "__main__":
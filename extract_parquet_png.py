@@ -1,13 +1,16 @@
 import argparse
+import json
+import random
+import time
 from pathlib import Path
-from typing import Optional
-import pyarrow.parquet as pq
-from pyarrow.parquet import ParquetFile
-from PIL import Image
+from typing import Dict, List, Optional
 from io import BytesIO
 
+from sharding import add_shard_arg, select, write_counters
+
 def open_image_cell(cell):
     # cell may be dict {"bytes": ...} or raw bytes
+    from PIL import Image
     if isinstance(cell, dict) and "bytes" in cell:
         raw = cell["bytes"]
     elif isinstance(cell, (bytes, bytearray)):
@@ -16,6 +19,27 @@ def open_image_cell(cell):
         raise ValueError(f"Unsupported image cell type: {type(cell)}")
     return Image.open(BytesIO(raw)).convert("RGB")
 
+# Named encoder configs for --benchmark: (ext, PIL save kwargs)
+BENCH_FORMATS = {
+    "png-1": ("png", {"compress_level": 1}),
+    "png-6": ("png", {"compress_level": 6}),
+    "png-9": ("png", {"compress_level": 9}),
+    "jpg-95": ("jpg", {"quality": 95}),
+    "jpg-90": ("jpg", {"quality": 90}),
+    "jpg-80": ("jpg", {"quality": 80}),
+    "webp-lossless": ("webp", {"lossless": True, "quality": 50, "method": 4}),
+    "webp-90": ("webp", {"quality": 90, "method": 4}),
+    "webp-80": ("webp", {"quality": 80, "method": 4}),
+}
+
+def save_kwargs(ext: str, png_compress: int = 6, jpeg_quality: int = 75) -> Dict:
+    """PIL save options for the chosen output format."""
+    if ext == "png":
+        return {"compress_level": png_compress}
+    if ext in ("jpg", "jpeg"):
+        return {"quality": jpeg_quality}
+    return {}
+
 def extract_one_parquet(
     parquet_path: Path,
     image_col: str = "image",
@@ -25,6 +49,7 @@ def extract_one_parquet(
     batch_size: int = 512,
     ext: str = "png",
     prefix: str = "frame_",
+    encode_kwargs: Optional[Dict] = None,
 ) -> int:
     parent = parquet_path.parent
     out_dir = parent / out_subdir
@@ -38,6 +63,8 @@ def extract_one_parquet(
         for p in existing:
             p.unlink()
 
+    from pyarrow.parquet import ParquetFile
+
     pf = ParquetFile(str(parquet_path))
     schema = pf.schema_arrow
     if image_col not in schema.names:
@@ -64,7 +91,7 @@ def extract_one_parquet(
                 print(f"[WARN] {parquet_path} row {row_base + i} failed: {e}")
                 continue
             out_path = out_dir / f"{prefix}{row_base + i:06d}.{ext}"
-            img.save(out_path)
+            img.save(out_path, **(encode_kwargs or {}))
             written += 1
 
         row_base += len(col)
@@ -86,6 +113,69 @@ def find_parquets(root: Path, parquet_name: str):
             parquets.extend(child.rglob(parquet_name))
     return sorted(parquets)
 
+def sample_frames(parquets: List[Path], image_col: str, n: int, seed: int = 0) -> List["Image.Image"]:
+    """Read n frames spread over the parquets (one row group read per frame)."""
+    from pyarrow.parquet import ParquetFile
+
+    rng = random.Random(seed)
+    frames = []
+    for i in range(n):
+        pf = ParquetFile(str(parquets[i % len(parquets)]))
+        rg = rng.randrange(pf.num_row_groups)
+        col = pf.read_row_group(rg, columns=[image_col])[image_col]
+        frames.append(open_image_cell(col[rng.randrange(len(col))].as_py()))
+    return frames
+
+def benchmark_formats(frames: List["Image.Image"], bar_rois: Dict[str, Optional[List[float]]],
+                      formats: List[str]) -> List[Dict]:
+    """
+    Encode/decode every frame with each format. Reports mean encode/decode ms,
+    mean bytes and agreement of data_cleaner.bar_present with the lossless source.
+    """
+    import cv2
+    import numpy as np
+    from data_cleaner import bar_present
+
+    def bar_states(bgr):
+        h, w = bgr.shape[:2]
+        states = []
+        for roi in bar_rois.values():
+            if not roi:
+                continue
+            x1, y1, x2, y2 = int(roi[0] * w), int(roi[1] * h), int(roi[2] * w), int(roi[3] * h)
+            states.append(bar_present(bgr[y1:y2, x1:x2]))
+        return states
+
+    reference = [bar_states(cv2.cvtColor(np.asarray(f), cv2.COLOR_RGB2BGR)) for f in frames]
+    rows = []
+    for name in formats:
+        ext, kwargs = BENCH_FORMATS[name]
+        pil_format = {"jpg": "JPEG", "png": "PNG", "webp": "WEBP"}[ext]
+        enc_t = dec_t = 0.0
+        total_bytes = agree = checks = 0
+        for frame, ref in zip(frames, reference):
+            buf = BytesIO()
+            t0 = time.perf_counter()
+            frame.save(buf, format=pil_format, **kwargs)
+            enc_t += time.perf_counter() - t0
+            data = np.frombuffer(buf.getvalue(), dtype=np.uint8)
+            total_bytes += len(data)
+            t0 = time.perf_counter()
+            decoded = cv2.imdecode(data, cv2.IMREAD_COLOR)
+            dec_t += time.perf_counter() - t0
+            got = bar_states(decoded)
+            agree += sum(a == b for a, b in zip(ref, got))
+            checks += len(ref)
+        n = len(frames)
+        rows.append({
+            "format": name,
+            "encode_ms": 1000 * enc_t / n,
+            "decode_ms": 1000 * dec_t / n,
+            "kb": total_bytes / n / 1024,
+            "bar_agreement": agree / checks if checks else float("nan"),
+        })
+    return rows
+
 def main():
     ap = argparse.ArgumentParser(description="Extract images adjacent to Parquet files under arena_* folders.")
     ap.add_argument("--root", default="/home/ostikar/MyProjects/CS541/ClashRoyale/hf_subset",
@@ -103,11 +193,23 @@ def main():
     ap.add_argument("--batch-size", type=int, default=512,
                     help="Arrow batch size.")
     ap.add_argument("--ext", default="png", choices=["png", "jpg", "jpeg"],
-                    help="Image extension.")
+                    help="Image extension (the label/split scripts read png/jpg only; "
+                         "webp is benchmark-only).")
+    ap.add_argument("--png-compress", type=int, default=6, choices=range(10),
+                    help="PNG zlib level (0-9); 1 encodes much faster for a little more disk.")
+    ap.add_argument("--jpeg-quality", type=int, default=75,
+                    help="JPEG quality (1-100).")
+    ap.add_argument("--benchmark", type=int, default=None, metavar="N",
+                    help="Benchmark encoders on N sampled frames instead of extracting.")
+    ap.add_argument("--bench-formats", nargs="+", default=list(BENCH_FORMATS), choices=list(BENCH_FORMATS),
+                    help="Encoder configs to benchmark.")
+    ap.add_argument("--bar-rois", default="/home/ostikar/MyProjects/CS541/ClashRoyale/data/towers3cls/bar_rois.json",
+                    help="bar_rois.json used for the health-bar agreement check.")
     ap.add_argument("--prefix", default="frame_",
                     help="Filename prefix for frames.")
     ap.add_argument("--dry-run", action="store_true",
                     help="List parquets found but do not extract.")
+    add_shard_arg(ap)
     args = ap.parse_args()
 
     root = Path(args.root)
@@ -115,7 +217,7 @@ def main():
         print(f"[ERROR] Root does not exist: {root}")
         return
 
-    parquets = find_parquets(root, args.parquet_name)
+    parquets = select(find_parquets(root, args.parquet_name), args.shard)
     if not parquets:
         print(f"[INFO] No '{args.parquet_name}' files found under arenas in {root}")
         return
@@ -128,6 +230,19 @@ def main():
         print("[INFO] Dry run complete — no extraction performed.")
         return
 
+    if args.benchmark:
+        bar_rois = json.loads(Path(args.bar_rois).read_text())
+        frames = sample_frames(parquets, args.image_col, args.benchmark)
+        rows = benchmark_formats(frames, bar_rois, args.bench_formats)
+        print(f"\n[BENCH] {len(frames)} frames")
+        print(f"  {'format':<14} {'encode ms':>10} {'decode ms':>10} {'KB':>9} {'bar agree':>10}")
+        for r in rows:
+            print(f"  {r['format']:<14} {r['encode_ms']:>10.2f} {r['decode_ms']:>10.2f} "
+                  f"{r['kb']:>9.1f} {r['bar_agreement']:>10.2%}")
+        return
+
+    encode_kwargs = save_kwargs(args.ext, args.png_compress, args.jpeg_quality)
+
     grand_total = 0
     for pq_path in parquets:
         grand_total += extract_one_parquet(
@@ -139,9 +254,12 @@ def main():
             batch_size=args.batch_size,
             ext=args.ext,
             prefix=args.prefix,
+            encode_kwargs=encode_kwargs,
         )
 
     print(f"[TOTAL] Extracted {grand_total} images across {len(parquets)} parquet files.")
+    if args.shard[1] > 1:
+        write_counters("extract", args.shard, {"parquets": len(parquets), "images": grand_total})
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
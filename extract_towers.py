@@ -1,8 +1,12 @@
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import cv2
 import shutil
 
+from image_meta import image_size
+
 RAW_DIR = Path(r"/home/ostikar/MyProjects/CS541/ClashRoyale/data/arena_02/game_01")
 OUT_DIR = Path(r"/home/ostikar/MyProjects/CS541/ClashRoyale/data/towers")
 IMG_OUT = OUT_DIR / "images"
@@ -32,6 +36,15 @@ def rect_to_yolo(x1, y1, x2, y2, W, H):
     h  = abs(y2 - y1) / H
     return cx, cy, w, h
 
+def link_or_copy(src: Path, dst: Path):
+    """Hard-link src to dst, falling back to a copy across filesystems."""
+    if dst.exists() or dst.is_symlink():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
 def norm_rect_to_abs(r, W, H):
     x1 = int(r[0] * W); y1 = int(r[1] * H); x2 = int(r[2] * W); y2 = int(r[3] * H)
     return x1, y1, x2, y2
@@ -119,19 +132,29 @@ def main():
         "princess_bot_l": CLASS_ID["princess"],
         "princess_bot_r": CLASS_ID["princess"],
     }
-    for img_path in load_images(RAW_DIR):
-        img = cv2.imread(str(img_path)); H, W = img.shape[:2]
-        # Copy image to dataset folder
-        out_img = IMG_OUT / img_path.name
-        shutil.copy2(img_path, out_img)
+    images = list(load_images(RAW_DIR))
+    if not images:
+        return
+
+    # Replay frames of one game share a resolution: read it once from a header
+    # and build the label text a single time instead of decoding every frame.
+    W, H = image_size(images[0])
+    lines = []
+    for name, rect in rois.items():
+        x1,y1,x2,y2 = norm_rect_to_abs(rect, W, H)
+        cx, cy, w, h = rect_to_yolo(x1,y1,x2,y2, W, H)
+        cls_id = name_to_cls[name]
+        lines.append(f"{cls_id} {cx:.6f} {cy:.6f} {w:.6f} {h:.6f}")
+    label_text = "\n".join(lines)
+
+    def export(img_path: Path):
+        # Link image into dataset folder (copy only if linking is not possible)
+        link_or_copy(img_path, IMG_OUT / img_path.name)
         # Write YOLO label
-        lines = []
-        for name, rect in rois.items():
-            x1,y1,x2,y2 = norm_rect_to_abs(rect, W, H)
-            cx, cy, w, h = rect_to_yolo(x1,y1,x2,y2, W, H)
-            cls_id = name_to_cls[name]
-            lines.append(f"{cls_id} {cx:.6f} {cy:.6f} {w:.6f} {h:.6f}")
-        (LBL_OUT / (img_path.stem + ".txt")).write_text("\n".join(lines))
+        (LBL_OUT / (img_path.stem + ".txt")).write_text(label_text)
+
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as pool:
+        list(pool.map(export, images))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
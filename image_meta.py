@@ -0,0 +1,38 @@
+"""
+Header-only image metadata helpers (no pixel decode).
+"""
+import os
+import struct
+from pathlib import Path
+
+def image_size(path: Path):
+    """
+    Read (W, H) from the PNG/JPEG header without decoding pixels.
+    Falls back to a full cv2 decode for other formats.
+    """
+    with open(path, "rb") as f:
+        head = f.read(24)
+        if head[:8] == b"\x89PNG\r\n\x1a\n" and head[12:16] == b"IHDR":
+            W, H = struct.unpack(">II", head[16:24])
+            return W, H
+        if head[:2] == b"\xff\xd8":
+            f.seek(2)
+            while True:
+                marker = f.read(2)
+                if len(marker) < 2 or marker[0] != 0xFF:
+                    break
+                code = marker[1]
+                if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+                    continue
+                seg_len = struct.unpack(">H", f.read(2))[0]
+                # SOF0..SOF15, excluding DHT (C4), JPG (C8) and DAC (CC)
+                if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+                    H, W = struct.unpack(">xHH", f.read(5))
+                    return W, H
+                f.seek(seg_len - 2, os.SEEK_CUR)
+    import cv2
+    img = cv2.imread(str(path))
+    if img is None:
+        raise ValueError(f"Could not read image size: {path}")
+    H, W = img.shape[:2]
+    return W, H
@@ -1,37 +1,91 @@
-from ultralytics import YOLO
+import argparse
 from pathlib import Path
 
+from sharding import add_shard_arg, game_key, in_shard, write_counters
+
 # Load the trained model
 MODEL_PATH = "runs/detect/tower_detection/weights/best.pt"
-model = YOLO(MODEL_PATH)
 
 # Path to test images
 TEST_SOURCE = "/home/ostikar/MyProjects/CS541/ClashRoyale/data/arena_01/game_01"
 
-# Run inference and save annotated images
-results = model.predict(
-    source=TEST_SOURCE,
-    conf=0.25,  # Confidence threshold
-    iou=0.45,   # NMS IOU threshold
-    imgsz=640,
-    save=True,  # Save annotated images with bounding boxes
-    save_txt=True,  # Save detection labels
-    show_labels=True,  # Show class names on boxes
-    show_conf=True,  # Show confidence scores on boxes
-    device=0,  # Use GPU
-    project='runs/detect',
-    name='inference_results',
-    exist_ok=True,
-    line_width=2,  # Bounding box thickness
-    show_boxes=True  # Show bounding boxes
-)
-
-print(f"\nInference complete!")
-print(f"Annotated images saved to: runs/detect/inference_results")
-print(f"Total images processed: {len(results)}")
-
-# Print summary of detections
-for i, r in enumerate(results):
-    img_name = Path(r.path).name
-    num_detections = len(r.boxes)
-    print(f"{img_name}: {num_detections} towers detected")
\ No newline at end of file
+IMGSZ = 640
+
+def run(model, source, name, stream=False, imgsz=IMGSZ):
+    # Run inference and save annotated images
+    return model.predict(
+        source=source,
+        stream=stream,  # Generator for large folders (no result list kept in memory)
+        verbose=not stream,
+        conf=0.25,  # Confidence threshold
+        iou=0.45,   # NMS IOU threshold
+        imgsz=imgsz,
+        save=True,  # Save annotated images with bounding boxes
+        save_txt=True,  # Save detection labels
+        show_labels=True,  # Show class names on boxes
+        show_conf=True,  # Show confidence scores on boxes
+        device=0,  # Use GPU
+        project='runs/detect',
+        name=name,
+        exist_ok=True,
+        line_width=2,  # Bounding box thickness
+        show_boxes=True  # Show bounding boxes
+    )
+
+def main():
+    ap = argparse.ArgumentParser(description="Run tower detection and save annotated images.")
+    ap.add_argument("--source", default=TEST_SOURCE,
+                    help="Image folder, or with --root-mode a data root containing arena_*/game_* folders.")
+    ap.add_argument("--root-mode", action="store_true",
+                    help="Treat --source as a data root and run every game (outputs per arena/game).")
+    ap.add_argument("--model", default=MODEL_PATH, help="Detector weights.")
+    ap.add_argument("--aspect", action="store_true",
+                    help="Fixed portrait input shape (e.g. 672x384) measured from the frames instead of square 640.")
+    ap.add_argument("--long-side", type=int, default=672, help="Long side of the --aspect shape.")
+    add_shard_arg(ap)
+    args = ap.parse_args()
+
+    from ultralytics import YOLO
+    model = YOLO(args.model)
+
+    def imgsz_for(folder):
+        if not args.aspect:
+            return IMGSZ
+        from aspect_mode import portrait_shape
+        return list(portrait_shape(Path(folder), args.long_side))
+
+    if not args.root_mode:
+        results = run(model, args.source, 'inference_results', imgsz=imgsz_for(args.source))
+        print(f"\nInference complete!")
+        print(f"Annotated images saved to: runs/detect/inference_results")
+        print(f"Total images processed: {len(results)}")
+
+        # Print summary of detections
+        for i, r in enumerate(results):
+            img_name = Path(r.path).name
+            num_detections = len(r.boxes)
+            print(f"{img_name}: {num_detections} towers detected")
+        return
+
+    # One output folder per game, so shards of a job array never collide
+    games = sorted(d for d in Path(args.source).glob('arena_*/game_*') if (d / 'images').exists())
+    games = [g for g in games if in_shard(game_key(g), args.shard)]
+    total_images = total_boxes = 0
+    for game in games:
+        name = f'inference_results/{game.parent.name}/{game.name}'
+        n_images = n_boxes = 0
+        for r in run(model, str(game / 'images'), name, stream=True, imgsz=imgsz_for(game / 'images')):
+            n_images += 1
+            n_boxes += len(r.boxes)
+        print(f"{game.parent.name}/{game.name}: {n_images} images, {n_boxes} towers detected")
+        total_images += n_images
+        total_boxes += n_boxes
+
+    print(f"\nInference complete! {len(games)} games, {total_images} images, {total_boxes} detections")
+    print(f"Annotated images saved to: runs/detect/inference_results/<arena>/<game>")
+    if args.shard[1] > 1:
+        write_counters('inference', args.shard,
+                       {'games': len(games), 'images': total_images, 'detections': total_boxes})
+
+if __name__ == '__main__':
+    main()
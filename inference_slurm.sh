@@ -6,6 +6,8 @@
 #SBATCH -p short
 #SBATCH -t 12:00:00
 #SBATCH --gres=gpu:1
+# Job array: each task runs 1/N of the games (merge: python sharding.py merge runs/shards/inference)
+##SBATCH --array=0-3
 
 # Load CUDA modules
 module load cuda12.6/toolkit
@@ -18,4 +20,10 @@ conda activate clashroyale
 gpu_debug
 
 # Run training
-/home/ostikar/.conda/envs/clashroyale/bin/python inference.py
\ No newline at end of file
+if [ -n "$SLURM_ARRAY_TASK_ID" ]; then
+    /home/ostikar/.conda/envs/clashroyale/bin/python inference.py --root-mode \
+        --source /home/ostikar/MyProjects/CS541/ClashRoyale/data \
+        --shard ${SLURM_ARRAY_TASK_ID}/${SLURM_ARRAY_TASK_COUNT}
+else
+    /home/ostikar/.conda/envs/clashroyale/bin/python inference.py
+fi
\ No newline at end of file
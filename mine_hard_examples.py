@@ -0,0 +1,158 @@
+"""
+Mine hard frames and write a compact training manifest.
+
+The current best.pt is run once over the corpus (batched, streaming) through
+pred_cache.py. Each frame is then scored from the cache:
+
+    disagreement  (missed + extra boxes vs the ROI auto-labels) / #labels,
+                  at conf >= --conf and IoU >= --iou
+    uncertainty   max over detections of 1 - |2*conf - 1|
+                  (1.0 for a detection at conf 0.5, 0.0 for conf 0 or 1)
+
+score = disagreement + --w-uncertainty * uncertainty. The manifest keeps the
+top --hard-frac of labelled frames by score plus a seeded random reservoir of
+the rest, and a data.yaml pointing train at that manifest (ultralytics
+accepts a .txt list of image paths). Frames without a label file can only
+contribute uncertainty and are left out of the manifest, since ultralytics
+would treat them as backgrounds; run autolabel.py on them first.
+
+Frames held out in the base split (val/ and test/ images, and the arena/game
+frames they were copied from, per their sources.txt from split_data.py) are
+never put in the manifest, so the val/test metrics stay on unseen frames.
+
+Usage:
+    python mine_hard_examples.py --model runs/detect/towers_bars_finetune/weights/best.pt \\
+        --source data/arena_01 data/arena_02 --out data/hard_mining
+and set DATA in tower_run.py to <out>/hard_data.yaml.
+"""
+import argparse
+import csv
+import os
+import random
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+from pred_cache import cache_predictions, label_path_for, load_cache, match
+
+def score_frames(cache, conf: float = 0.25, iou: float = 0.5, w_uncertainty: float = 1.0):
+    """Per-frame (score, disagreement, uncertainty) arrays."""
+    n = len(cache['files'])
+    keep = cache['pred_conf'] >= conf
+    kept = dict(cache)
+    for k in ('pred_frame', 'pred_cls', 'pred_conf', 'pred_box'):
+        kept[k] = cache[k][keep]
+    tp = match(kept, np.array([iou]))[:, 0]
+
+    n_gt = np.bincount(cache['gt_frame'], minlength=n)
+    n_pred = np.bincount(kept['pred_frame'], minlength=n)
+    n_tp = np.bincount(kept['pred_frame'], weights=tp, minlength=n)
+    disagreement = ((n_gt - n_tp) + (n_pred - n_tp)) / np.maximum(n_gt, 1)
+
+    # Ambiguity of every detection above the cache floor, reduced per frame with max
+    band = 1.0 - np.abs(2.0 * cache['pred_conf'] - 1.0)
+    uncertainty = np.zeros(n)
+    np.maximum.at(uncertainty, cache['pred_frame'], band)
+
+    return disagreement + w_uncertainty * uncertainty, disagreement, uncertainty
+
+def held_out_frames(data: dict, splits=('val', 'test')) -> set:
+    """Absolute paths of the split images and of the source frames they were copied from."""
+    base = Path(data['path'])
+    frames = set()
+    for split in splits:
+        img_dir = base / data[split]
+        sources = img_dir.parent / 'sources.txt'
+        if not sources.exists():
+            raise FileNotFoundError(f"{sources} not found; re-run split_data.py so held-out frames can be excluded")
+        for ln in sources.read_text().splitlines():
+            name, _, src = ln.partition('\t')
+            if src:
+                frames.add(os.path.abspath(src))
+                frames.add(os.path.abspath(img_dir / name))
+    return frames
+
+def build_manifest(cache, scores, hard_frac: float, reservoir: int, seed: int, exclude=frozenset()):
+    """(hard idx, easy idx, #unlabelled, #held out) over labelled frames not in exclude."""
+    files = cache['files']
+    labelled = np.array([label_path_for(Path(f)).exists() for f in files])
+    held_out = np.array([os.path.abspath(f) in exclude for f in files], dtype=bool)
+    idx = np.flatnonzero(labelled & ~held_out)
+    n_hard = int(round(len(idx) * hard_frac))
+    by_score = idx[np.argsort(-scores[idx], kind='stable')]
+    hard, rest = by_score[:n_hard], by_score[n_hard:]
+    rng = random.Random(seed)
+    easy = rng.sample(list(rest), min(reservoir, len(rest)))
+    return hard, np.array(sorted(easy), dtype=np.int64), int((~labelled).sum()), int((labelled & held_out).sum())
+
+def main():
+    ap = argparse.ArgumentParser(description="Score frames with the current model and keep the hard ones.")
+    ap.add_argument("--model", default="runs/detect/towers_bars_finetune/weights/best.pt")
+    ap.add_argument("--source", nargs="+", default=None,
+                    help="Image folders to mine (arena_*/game_* or split images/).")
+    ap.add_argument("--cache", default=None, help="Reuse an existing pred_cache.py .npz instead of predicting.")
+    ap.add_argument("--out", default="/home/ostikar/MyProjects/CS541/ClashRoyale/data/hard_mining")
+    ap.add_argument("--data", default="data.yaml", help="Base data.yaml (val/test/names are kept).")
+    ap.add_argument("--imgsz", type=int, default=640)
+    ap.add_argument("--batch", type=int, default=64)
+    ap.add_argument("--device", default=0)
+    ap.add_argument("--conf", type=float, default=0.25, help="Confidence for counting detections.")
+    ap.add_argument("--iou", type=float, default=0.5, help="IoU for agreeing with a label.")
+    ap.add_argument("--w-uncertainty", type=float, default=1.0)
+    ap.add_argument("--hard-frac", type=float, default=0.1, help="Fraction of labelled frames kept as hard.")
+    ap.add_argument("--reservoir", type=int, default=2000, help="Random easy frames kept alongside.")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    data = yaml.safe_load(Path(args.data).read_text())
+    try:
+        exclude = held_out_frames(data)
+    except FileNotFoundError as e:
+        ap.error(str(e))
+
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if args.cache:
+        cache_path = Path(args.cache)
+    else:
+        if not args.source:
+            ap.error("--source is required unless --cache is given")
+        cache_path = cache_predictions(args.model, [Path(s) for s in args.source], out_dir / 'mining_preds.npz',
+                                       args.imgsz, args.batch, device=args.device)
+    cache = load_cache(cache_path)
+    scores, disagreement, uncertainty = score_frames(cache, args.conf, args.iou, args.w_uncertainty)
+    hard, easy, unlabelled, held_out = build_manifest(cache, scores, args.hard_frac, args.reservoir,
+                                                      args.seed, exclude)
+
+    files = cache['files']
+    with open(out_dir / 'scores.csv', 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['file', 'arena', 'game', 'score', 'disagreement', 'uncertainty'])
+        for i in np.argsort(-scores, kind='stable'):
+            w.writerow([files[i], cache['arena'][i], cache['game'][i],
+                        f"{scores[i]:.4f}", f"{disagreement[i]:.4f}", f"{uncertainty[i]:.4f}"])
+
+    manifest = out_dir / 'hard_manifest.txt'
+    manifest.write_text('\n'.join(str(files[i]) for i in np.concatenate([hard, easy])) + '\n')
+
+    base = Path(data['path'])
+    data_out = {
+        'path': str(base),
+        'train': str(manifest),
+        'val': str(base / data['val']),
+        'test': str(base / data['test']),
+        'names': data['names'],
+    }
+    (out_dir / 'hard_data.yaml').write_text(yaml.safe_dump(data_out, sort_keys=False))
+
+    print(f"[INFO] Scored {len(files)} frames ({unlabelled} without labels, excluded from manifest)")
+    print(f"[INFO] {held_out} labelled frames are in the base val/test splits, excluded from manifest")
+    print(f"[INFO] Hard frames: {len(hard)}, random reservoir: {len(easy)}")
+    if len(hard):
+        print(f"[INFO] Hard score range: {scores[hard].min():.3f} - {scores[hard].max():.3f}")
+    print(f"[DONE] Manifest: {manifest}")
+    print(f"       Data config: {out_dir / 'hard_data.yaml'}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+"""
+Cache raw detections once and evaluate them offline.
+
+predict: run the model over game folders or a split folder a single time and
+store every detection (low conf, like model.val) in a columnar .npz, together
+with the ground-truth boxes parsed from the YOLO label files:
+
+    files, arena, game            one entry per frame
+    pred_frame, pred_cls, pred_conf, pred_box (xyxy, normalized)
+    gt_frame, gt_cls, gt_box      (xyxy, normalized)
+
+eval: vectorized mAP50 / mAP50-95 / precision / recall per class, optionally
+broken down per arena or per game and at any IoU threshold, without touching
+the GPU. Predictions are matched to ground truth over all frames at once, so
+re-slicing is just a sort and a cumsum.
+
+Usage:
+    python pred_cache.py predict --model best.pt --source data/yolo_dataset/test/images --out test_preds.npz
+    python pred_cache.py eval --cache test_preds.npz --by arena
+    python pred_cache.py eval --cache test_preds.npz --classes health_bar --iou 0.75
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import yaml
+
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+def label_path_for(img_path: Path) -> Path:
+    """YOLO convention: .../images/x.png -> .../labels/x.txt"""
+    parts = list(img_path.parts)
+    idx = len(parts) - 1 - parts[::-1].index('images') if 'images' in parts else None
+    if idx is None:
+        return img_path.with_suffix('.txt')
+    parts[idx] = 'labels'
+    return Path(*parts).with_suffix('.txt')
+
+def source_of(img_path: Path, sources: Dict[str, str]) -> Path:
+    """Original arena/game path of a split image (sources.txt from split_data.py), else itself."""
+    return Path(sources.get(img_path.name, str(img_path)))
+
+def arena_game(path: Path):
+    arena = next((p for p in path.parts if p.startswith('arena_')), 'unknown')
+    game = next((p for p in path.parts if p.startswith('game_')), 'unknown')
+    return arena, f'{arena}/{game}'
+
+def collect_images(sources: List[Path]) -> List[Path]:
+    images = []
+    for src in sources:
+        if src.is_file():
+            images.append(src)
+        else:
+            images.extend(sorted(list(src.rglob('*.png')) + list(src.rglob('*.jpg'))))
+    return [p for p in images if 'labels' not in p.parts]
+
+def read_sources(images: List[Path]) -> Dict[str, str]:
+    """Merge sources.txt mappings written next to split images/ folders."""
+    mapping = {}
+    for parent in {p.parent.parent for p in images}:
+        f = parent / 'sources.txt'
+        if f.exists():
+            for ln in f.read_text().splitlines():
+                name, _, src = ln.partition('\t')
+                if src:
+                    mapping[name] = src
+    return mapping
+
+def _read_label(path: Path) -> np.ndarray:
+    if not path.exists():
+        return np.zeros((0, 5), dtype=np.float32)
+    rows = [ln.split()[:5] for ln in path.read_text().splitlines() if len(ln.split()) >= 5]
+    return np.array(rows, dtype=np.float32).reshape(-1, 5)
+
+def load_labels(images: List[Path], workers: int = 16):
+    """Ground truth as columnar arrays (frame, cls, xyxy)."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        labels = list(pool.map(_read_label, [label_path_for(p) for p in images]))
+    counts = np.array([len(l) for l in labels], dtype=np.int64)
+    rows = np.concatenate(labels) if labels else np.zeros((0, 5), dtype=np.float32)
+    frame = np.repeat(np.arange(len(images), dtype=np.int32), counts)
+    xy = rows[:, 1:3]; wh = rows[:, 3:5]
+    box = np.hstack([xy - wh / 2, xy + wh / 2]).astype(np.float32)
+    return frame, rows[:, 0].astype(np.int16), box
+
+def cache_predictions(model_path: str, sources: List[Path], out_path: Path, imgsz=640,
+                      batch: int = 32, conf: float = 0.001, iou: float = 0.7, device=0,
+                      rect: bool = True) -> Path:
+    from ultralytics import YOLO
+
+    images = collect_images(sources)
+    mapping = read_sources(images)
+    model = YOLO(model_path)
+    frames, classes, confs, boxes = [], [], [], []
+    for i, r in enumerate(model.predict(source=[str(p) for p in images], imgsz=imgsz, batch=batch,
+                                        rect=rect, conf=conf, iou=iou, device=device, stream=True,
+                                        verbose=False)):
+        n = len(r.boxes)
+        frames.append(np.full(n, i, dtype=np.int32))
+        classes.append(r.boxes.cls.cpu().numpy().astype(np.int16))
+        confs.append(r.boxes.conf.cpu().numpy().astype(np.float32))
+        boxes.append(r.boxes.xyxyn.cpu().numpy().astype(np.float32))
+
+    gt_frame, gt_cls, gt_box = load_labels(images)
+    origins = [arena_game(source_of(p, mapping)) for p in images]
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(
+        out_path,
+        files=np.array([str(p) for p in images]),
+        arena=np.array([a for a, _ in origins]),
+        game=np.array([g for _, g in origins]),
+        names=np.array([model.names[i] for i in sorted(model.names)]),
+        pred_frame=np.concatenate(frames) if frames else np.zeros(0, np.int32),
+        pred_cls=np.concatenate(classes) if classes else np.zeros(0, np.int16),
+        pred_conf=np.concatenate(confs) if confs else np.zeros(0, np.float32),
+        pred_box=np.concatenate(boxes) if boxes else np.zeros((0, 4), np.float32),
+        gt_frame=gt_frame, gt_cls=gt_cls, gt_box=gt_box,
+    )
+    return out_path
+
+def load_cache(path) -> Dict[str, np.ndarray]:
+    with np.load(path, allow_pickle=False) as z:
+        return {k: z[k] for k in z.files}
+
+def match(cache: Dict[str, np.ndarray], iouv: np.ndarray) -> np.ndarray:
+    """
+    (n_pred, len(iouv)) bool TP matrix. Candidate pairs are all (pred, gt) of
+    the same frame and class; for each threshold pairs are taken greedily by
+    IoU, one gt per pred and one pred per gt (as in ultralytics val).
+    """
+    pf, pc, pb = cache['pred_frame'], cache['pred_cls'], cache['pred_box']
+    gf, gc, gb = cache['gt_frame'], cache['gt_cls'], cache['gt_box']
+    tp = np.zeros((len(pf), len(iouv)), dtype=bool)
+    if not len(pf) or not len(gf):
+        return tp
+
+    # Group ground truth by (frame, cls) key and expand to candidate pairs
+    n_cls = int(max(pc.max(initial=0), gc.max(initial=0))) + 1
+    gkey = gf.astype(np.int64) * n_cls + gc
+    order = np.argsort(gkey, kind='stable')
+    gkey_sorted = gkey[order]
+    pkey = pf.astype(np.int64) * n_cls + pc
+    lo = np.searchsorted(gkey_sorted, pkey, 'left')
+    hi = np.searchsorted(gkey_sorted, pkey, 'right')
+    counts = hi - lo
+    pi = np.repeat(np.arange(len(pf)), counts)
+    offs = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    gi = order[np.repeat(lo, counts) + offs]
+
+    a, b = pb[pi], gb[gi]
+    iw = np.clip(np.minimum(a[:, 2], b[:, 2]) - np.maximum(a[:, 0], b[:, 0]), 0, None)
+    ih = np.clip(np.minimum(a[:, 3], b[:, 3]) - np.maximum(a[:, 1], b[:, 1]), 0, None)
+    inter = iw * ih
+    union = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1]) + (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1]) - inter
+    iou = np.where(union > 0, inter / np.maximum(union, 1e-12), 0.0)
+
+    by_iou = np.argsort(-iou, kind='stable')
+    pi, gi, iou = pi[by_iou], gi[by_iou], iou[by_iou]
+    for t, thr in enumerate(iouv):
+        keep = np.flatnonzero(iou >= thr)  # IoU-descending
+        _, first = np.unique(gi[keep], return_index=True)
+        keep = np.sort(keep[first])  # one pred per gt, back in IoU order
+        _, first = np.unique(pi[keep], return_index=True)
+        tp[pi[keep[first]], t] = True
+    return tp
+
+def average_precision(recall: np.ndarray, precision: np.ndarray) -> float:
+    """COCO 101-point interpolated AP."""
+    mrec = np.concatenate(([0.0], recall, [1.0]))
+    mpre = np.concatenate(([1.0], precision, [0.0]))
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    x = np.linspace(0, 1, 101)
+    y = np.interp(x, mrec, mpre)
+    return float(((y[1:] + y[:-1]) / 2 * np.diff(x)).sum())
+
+def evaluate(cache: Dict[str, np.ndarray], tp: np.ndarray, frame_mask: Optional[np.ndarray] = None,
+             conf_thr: float = 0.25, classes: Optional[List[int]] = None) -> Dict[int, Dict[str, float]]:
+    """
+    Per-class metrics over the frames selected by frame_mask:
+    n_gt, ap (per IoU threshold), p and r at conf_thr.
+    """
+    pf, pc, conf = cache['pred_frame'], cache['pred_cls'], cache['pred_conf']
+    gf, gc = cache['gt_frame'], cache['gt_cls']
+    if frame_mask is not None:
+        psel, gsel = frame_mask[pf], frame_mask[gf]
+        pc, conf, tp, gc = pc[psel], conf[psel], tp[psel], gc[gsel]
+    if classes is None:
+        classes = sorted(set(np.unique(gc).tolist()) | set(np.unique(pc).tolist()))
+
+    results = {}
+    for c in classes:
+        sel = pc == c
+        n_gt = int((gc == c).sum())
+        order = np.argsort(-conf[sel], kind='stable')
+        tpc = tp[sel][order].cumsum(0)
+        fpc = (~tp[sel][order]).cumsum(0)
+        if n_gt == 0 or not len(order):
+            ap = np.zeros(tp.shape[1])
+            p = r = 0.0
+        else:
+            recall = tpc / n_gt
+            precision = tpc / (tpc + fpc)
+            ap = np.array([average_precision(recall[:, t], precision[:, t]) for t in range(tp.shape[1])])
+            k = int((conf[sel] >= conf_thr).sum())
+            p = float(precision[k - 1, 0]) if k else 0.0
+            r = float(recall[k - 1, 0]) if k else 0.0
+        results[int(c)] = {'n_gt': n_gt, 'ap': ap, 'p': p, 'r': r}
+    return results
+
+def mean_ap(results: Dict[int, Dict[str, float]]):
+    """(mAP50, mAP50-95) over the classes that have ground truth."""
+    scored = [m for m in results.values() if m['n_gt'] > 0]
+    if not scored:
+        return 0.0, 0.0
+    return (float(np.mean([m['ap'][0] for m in scored])),
+            float(np.mean([m['ap'].mean() for m in scored])))
+
+def print_table(title: str, results: Dict[int, Dict[str, float]], names: List[str], iouv: np.ndarray):
+    print(f"\n{title}")
+    print(f"  {'class':<12} {'gt':>7} {'P':>7} {'R':>7} {f'AP{iouv[0]*100:.0f}':>7} {'AP':>7}")
+    for c, m in results.items():
+        name = names[c] if c < len(names) else f'class_{c}'
+        print(f"  {name:<12} {m['n_gt']:>7} {m['p']:>7.4f} {m['r']:>7.4f} "
+              f"{m['ap'][0]:>7.4f} {m['ap'].mean():>7.4f}")
+    scored = [m for m in results.values() if m['n_gt'] > 0]
+    if scored:
+        ap = np.array([m['ap'] for m in scored])
+        print(f"  {'all':<12} {sum(m['n_gt'] for m in scored):>7} "
+              f"{np.mean([m['p'] for m in scored]):>7.4f} "
+              f"{np.mean([m['r'] for m in scored]):>7.4f} "
+              f"{ap[:, 0].mean():>7.4f} {ap.mean():>7.4f}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Cache detections once; evaluate offline.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("predict", help="Run the model once and cache detections + labels.")
+    p.add_argument("--model", required=True)
+    p.add_argument("--source", nargs="+", required=True, help="Image folders (split images/ or arena_*/game_*).")
+    p.add_argument("--out", required=True)
+    p.add_argument("--imgsz", type=int, default=640)
+    p.add_argument("--batch", type=int, default=32)
+    p.add_argument("--conf", type=float, default=0.001)
+    p.add_argument("--iou", type=float, default=0.7, help="NMS IoU.")
+    p.add_argument("--device", default=0)
+
+    e = sub.add_parser("eval", help="Evaluate a prediction cache.")
+    e.add_argument("--cache", required=True)
+    e.add_argument("--by", choices=["all", "arena", "game"], default="all")
+    e.add_argument("--iou", type=float, default=None,
+                   help="Single IoU threshold (default: 0.50:0.95 like mAP50-95).")
+    e.add_argument("--conf", type=float, default=0.25, help="Confidence for P/R.")
+    e.add_argument("--classes", nargs="+", default=None, help="Class names or ids to report.")
+    e.add_argument("--data", default="data.yaml", help="Class names if the cache has none.")
+    args = ap.parse_args()
+
+    if args.cmd == "predict":
+        out = cache_predictions(args.model, [Path(s) for s in args.source], Path(args.out),
+                                args.imgsz, args.batch, args.conf, args.iou, args.device)
+        print(f"[DONE] Cached predictions at {out}")
+        return
+
+    cache = load_cache(args.cache)
+    names = [str(n) for n in cache['names']] if 'names' in cache else \
+        [n for _, n in sorted(yaml.safe_load(Path(args.data).read_text())['names'].items())]
+    classes = None
+    if args.classes:
+        classes = [int(c) if c.isdigit() else names.index(c) for c in args.classes]
+    iouv = np.array([args.iou]) if args.iou is not None else IOU_THRESHOLDS
+    tp = match(cache, iouv)
+
+    if args.by == "all":
+        print_table("All frames", evaluate(cache, tp, None, args.conf, classes), names, iouv)
+        return
+    groups = cache[args.by]
+    for g in np.unique(groups):
+        print_table(f"{args.by}: {g}", evaluate(cache, tp, groups == g, args.conf, classes), names, iouv)
+
+if __name__ == '__main__':
+    main()
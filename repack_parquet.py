@@ -0,0 +1,165 @@
+"""
+Repack downloaded frames.parquet files for random access.
+
+The upstream row-group layout only allows streaming front to back. Each file
+is rewritten (next to the original, or in place with --replace) with:
+
+    frame_idx         int32 row position (frame number)
+    <original cols>   unchanged (full-resolution image bytes etc.)
+    thumb             low-resolution JPEG of the frame
+    roi_<name>        optional PNG crops of the tower/bar ROIs (--rois/--bar-rois)
+
+in small fixed row groups (--rows-per-group, stored in the file metadata), so
+frame i lives in row group i // rows_per_group and a single row group read
+fetches it. Sampling, dedup, cleaning and visualization can project only the
+small columns (thumb, roi_*), which parquet stores in separate column chunks.
+
+Usage:
+    python repack_parquet.py --root hf_subset --rois data/towers/rois.json --replace
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from PIL import Image
+
+from extract_parquet_png import find_parquets, open_image_cell
+
+ROWS_PER_GROUP_KEY = b'repack.rows_per_group'
+REPACKED_NAME = 'frames.repacked.parquet'
+
+def _encode(img: Image.Image, fmt: str, **kwargs) -> bytes:
+    buf = BytesIO()
+    img.save(buf, format=fmt, **kwargs)
+    return buf.getvalue()
+
+def repack_one(parquet_path: Path, image_col: str = 'image', rows_per_group: int = 64,
+               thumb_width: int = 128, rois: Optional[Dict[str, List[float]]] = None,
+               replace: bool = False) -> int:
+    pf = pq.ParquetFile(str(parquet_path))
+    if pf.schema_arrow.metadata and ROWS_PER_GROUP_KEY in pf.schema_arrow.metadata:
+        print(f"[SKIP] {parquet_path} is already repacked")
+        return 0
+    rois = {k: v for k, v in (rois or {}).items() if v and v[2] > v[0] and v[3] > v[1]}
+    out_path = parquet_path.with_name(REPACKED_NAME)
+    tmp_path = out_path.with_suffix('.tmp')
+
+    writer = None
+    pending = []
+    row_base = 0
+
+    def flush(final=False):
+        nonlocal writer, pending
+        if not pending:
+            return
+        table = pa.concat_tables(pending)
+        n_full = len(table) if final else len(table) // rows_per_group * rows_per_group
+        if n_full == 0:
+            return
+        if writer is None:
+            meta = dict(table.schema.metadata or {})
+            meta[ROWS_PER_GROUP_KEY] = str(rows_per_group).encode()
+            writer = pq.ParquetWriter(str(tmp_path), table.schema.with_metadata(meta))
+        writer.write_table(table.slice(0, n_full), row_group_size=rows_per_group)
+        rest = table.slice(n_full)
+        pending = [rest] if len(rest) else []
+
+    for batch in pf.iter_batches(batch_size=rows_per_group * 8):
+        col = batch.column(image_col)
+        thumbs = []
+        crops = {name: [] for name in rois}
+        for i in range(len(col)):
+            try:
+                img = open_image_cell(col[i].as_py())
+            except Exception as e:
+                print(f"[WARN] {parquet_path} row {row_base + i} failed: {e}")
+                thumbs.append(None)
+                for name in rois:
+                    crops[name].append(None)
+                continue
+            W, H = img.size
+            thumb = img.resize((thumb_width, max(1, round(H * thumb_width / W))), Image.BILINEAR)
+            thumbs.append(_encode(thumb, 'JPEG', quality=85))
+            for name, r in rois.items():
+                box = (int(r[0] * W), int(r[1] * H), int(r[2] * W), int(r[3] * H))
+                crops[name].append(_encode(img.crop(box), 'PNG', compress_level=1))
+
+        table = pa.Table.from_batches([batch])
+        table = table.add_column(0, 'frame_idx', pa.array(range(row_base, row_base + len(col)), pa.int32()))
+        table = table.append_column('thumb', pa.array(thumbs, pa.binary()))
+        for name in rois:
+            table = table.append_column(f'roi_{name}', pa.array(crops[name], pa.binary()))
+        pending.append(table)
+        row_base += len(col)
+        flush()
+    flush(final=True)
+
+    if writer is None:
+        return 0
+    writer.close()
+    if replace:
+        os.replace(tmp_path, parquet_path)
+    else:
+        os.replace(tmp_path, out_path)
+    return row_base
+
+def rows_per_group(pf: pq.ParquetFile) -> int:
+    meta = pf.schema_arrow.metadata or {}
+    if ROWS_PER_GROUP_KEY not in meta:
+        raise ValueError("Not a repacked parquet (run repack_parquet.py)")
+    return int(meta[ROWS_PER_GROUP_KEY])
+
+def read_frame(parquet_path: Path, frame_idx: int, column: str = 'image'):
+    """Fetch one frame's cell with a single row-group read."""
+    pf = pq.ParquetFile(str(parquet_path))
+    rg = rows_per_group(pf)
+    group = pf.read_row_group(frame_idx // rg, columns=[column])
+    return group.column(column)[frame_idx % rg].as_py()
+
+def read_columns(parquet_path: Path, columns: List[str] = ('frame_idx', 'thumb')) -> pa.Table:
+    """Read only small columns (e.g. thumbnails) for the whole game."""
+    return pq.read_table(str(parquet_path), columns=list(columns))
+
+def _repack_job(args):
+    path, kwargs = args
+    return path, repack_one(Path(path), **kwargs)
+
+def main():
+    ap = argparse.ArgumentParser(description="Repack frames.parquet with small row groups, index and thumbnails.")
+    ap.add_argument("--root", default="/home/ostikar/MyProjects/CS541/ClashRoyale/hf_subset",
+                    help="Root containing arena_* folders.")
+    ap.add_argument("--parquet-name", default="frames.parquet")
+    ap.add_argument("--image-col", default="image")
+    ap.add_argument("--rows-per-group", type=int, default=64)
+    ap.add_argument("--thumb-width", type=int, default=128)
+    ap.add_argument("--rois", default=None, help="Optional rois.json; adds roi_<name> crop columns.")
+    ap.add_argument("--bar-rois", default=None, help="Optional bar_rois.json; adds bar crop columns.")
+    ap.add_argument("--replace", action="store_true",
+                    help=f"Replace the original file instead of writing {REPACKED_NAME}.")
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    args = ap.parse_args()
+
+    rois = {}
+    for p in (args.rois, args.bar_rois):
+        if p:
+            rois.update(json.loads(Path(p).read_text()))
+    kwargs = dict(image_col=args.image_col, rows_per_group=args.rows_per_group,
+                  thumb_width=args.thumb_width, rois=rois, replace=args.replace)
+
+    parquets = find_parquets(Path(args.root), args.parquet_name)
+    print(f"[INFO] Repacking {len(parquets)} parquet files")
+    total = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for path, n in pool.map(_repack_job, [(str(p), kwargs) for p in parquets]):
+            print(f"[DONE] {path}: {n} frames")
+            total += n
+    print(f"[TOTAL] Repacked {total} frames across {len(parquets)} files")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Pack a split dataset into large sequential-read tar shards and read them back.
+
+Shared cluster filesystems are slow at opening hundreds of thousands of small
+PNGs. This packs each split (output of split_data.py) into ~--shard-mb tar
+shards, samples grouped by arena/game (from split_data.py's sources.txt):
+
+    <out>/train-00000.tar   <key>.png + <key>.txt per sample
+    <out>/index.json        per split: shard name, sample count, bytes, games
+
+Reading:
+    stream_samples()  sequential tar reads with a bounded shuffle buffer
+                      (shards are split across torch DataLoader workers)
+    stage_shards()    unpack shards sequentially to node-local disk and
+                      write a data.yaml for ultralytics (used by tower_run.py)
+
+Usage:
+    python shard_dataset.py write --split-dir data/yolo_dataset --out data/yolo_shards
+    python shard_dataset.py stage --shards data/yolo_shards --out $TMPDIR/yolo_dataset
+    python shard_dataset.py compare --shards data/yolo_shards --split-dir data/yolo_dataset
+"""
+import argparse
+import io
+import json
+import random
+import tarfile
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import yaml
+
+SPLITS = ['train', 'val', 'test']
+
+def _game_of(src: str) -> str:
+    parts = Path(src).parts
+    arena = next((p for p in parts if p.startswith('arena_')), 'unknown')
+    game = next((p for p in parts if p.startswith('game_')), 'unknown')
+    return f'{arena}/{game}'
+
+def _split_samples(split_dir: Path) -> List[Tuple[str, Path, Path]]:
+    """(game, image, label) for a split, grouped by game then frame name."""
+    sources = {}
+    if (split_dir / 'sources.txt').exists():
+        for ln in (split_dir / 'sources.txt').read_text().splitlines():
+            name, _, src = ln.partition('\t')
+            sources[name] = src
+    images = sorted(list((split_dir / 'images').glob('*.png')) + list((split_dir / 'images').glob('*.jpg')))
+    samples = [(_game_of(sources.get(p.name, '')), p, split_dir / 'labels' / f'{p.stem}.txt') for p in images]
+    return sorted(samples, key=lambda s: (s[0], s[1].name))
+
+def _add_bytes(tar: tarfile.TarFile, name: str, data: bytes):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+def write_shards(split_dir: Path, out_dir: Path, shard_mb: int = 1024) -> Dict[str, List[Dict]]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    limit = shard_mb * 1024 * 1024
+    index = {}
+    for split in SPLITS:
+        if not (split_dir / split / 'images').exists():
+            continue
+        shards, tar, cur = [], None, None
+        for game, img, lbl in _split_samples(split_dir / split):
+            if tar is None or cur['bytes'] >= limit:
+                if tar is not None:
+                    tar.close()
+                cur = {'shard': f'{split}-{len(shards):05d}.tar', 'samples': 0, 'bytes': 0, 'games': []}
+                shards.append(cur)
+                tar = tarfile.open(out_dir / cur['shard'], 'w')
+            data = img.read_bytes()
+            label = lbl.read_bytes() if lbl.exists() else b''
+            _add_bytes(tar, img.name, data)
+            _add_bytes(tar, f'{img.stem}.txt', label)
+            cur['samples'] += 1
+            cur['bytes'] += len(data) + len(label)
+            if not cur['games'] or cur['games'][-1] != game:
+                cur['games'].append(game)
+        if tar is not None:
+            tar.close()
+        index[split] = shards
+        print(f"[INFO] {split}: {sum(s['samples'] for s in shards)} samples in {len(shards)} shards")
+    (out_dir / 'index.json').write_text(json.dumps(index, indent=2))
+    return index
+
+def iter_shard(path: Path) -> Iterator[Tuple[str, str, bytes, bytes]]:
+    """Sequentially yield (key, image_name, image_bytes, label_bytes) from one shard."""
+    pending = {}
+    with tarfile.open(path, 'r|') as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            data = tar.extractfile(member).read()
+            stem, _, ext = member.name.rpartition('.')
+            entry = pending.setdefault(stem, {})
+            entry[ext] = (member.name, data)
+            if 'txt' in entry and len(entry) == 2:
+                name, img = next(v for k, v in entry.items() if k != 'txt')
+                yield stem, name, img, entry['txt'][1]
+                del pending[stem]
+
+def stream_samples(shard_dir: Path, split: str = 'train', shuffle_buffer: int = 2048,
+                   seed: Optional[int] = None) -> Iterator[Tuple[str, str, bytes, bytes]]:
+    """
+    Stream samples of a split with shard-order shuffling and a bounded
+    shuffle buffer. Inside a torch DataLoader, shards are divided among workers.
+    """
+    index = json.loads((shard_dir / 'index.json').read_text())
+    shards = [s['shard'] for s in index[split]]
+    try:
+        from torch.utils.data import get_worker_info
+        info = get_worker_info()
+    except ImportError:
+        info = None
+    if info is not None:
+        shards = shards[info.id::info.num_workers]
+    rng = random.Random(seed)
+    rng.shuffle(shards)
+
+    buf = []
+    for shard in shards:
+        for sample in iter_shard(shard_dir / shard):
+            if len(buf) < shuffle_buffer:
+                buf.append(sample)
+                continue
+            i = rng.randrange(len(buf))
+            buf[i], sample = sample, buf[i]
+            yield sample
+    rng.shuffle(buf)
+    yield from buf
+
+def stage_shards(shard_dir: Path, out_dir: Path, data_yaml: str = 'data.yaml') -> Path:
+    """Unpack all shards sequentially into a local YOLO dataset; returns its data.yaml."""
+    index = json.loads((shard_dir / 'index.json').read_text())
+    for split, shards in index.items():
+        (out_dir / split / 'images').mkdir(parents=True, exist_ok=True)
+        (out_dir / split / 'labels').mkdir(parents=True, exist_ok=True)
+        for s in shards:
+            for stem, name, img, label in iter_shard(shard_dir / s['shard']):
+                (out_dir / split / 'images' / name).write_bytes(img)
+                (out_dir / split / 'labels' / f'{stem}.txt').write_bytes(label)
+    data = yaml.safe_load(Path(data_yaml).read_text())
+    data.update(path=str(out_dir), **{s: f'{s}/images' for s in index})
+    staged = out_dir / 'data.yaml'
+    staged.write_text(yaml.safe_dump(data, sort_keys=False))
+    return staged
+
+def compare(shard_dir: Path, split_dir: Path, split: str = 'train', limit: Optional[int] = None):
+    """Time sequential shard reads vs loose-file reads and check the bytes match."""
+    t0 = time.perf_counter()
+    from_shards = {}
+    index = json.loads((shard_dir / 'index.json').read_text())
+    for s in index[split]:
+        for stem, name, img, label in iter_shard(shard_dir / s['shard']):
+            from_shards[name] = (img, label)
+            if limit and len(from_shards) >= limit:
+                break
+        if limit and len(from_shards) >= limit:
+            break
+    t_shard = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    loose = {}
+    for name in from_shards:
+        img = split_dir / split / 'images' / name
+        lbl = split_dir / split / 'labels' / f'{Path(name).stem}.txt'
+        loose[name] = (img.read_bytes(), lbl.read_bytes() if lbl.exists() else b'')
+    t_loose = time.perf_counter() - t0
+
+    n = len(from_shards)
+    mb = sum(len(a) + len(b) for a, b in from_shards.values()) / 1e6
+    mismatched = sum(from_shards[k] != loose[k] for k in from_shards)
+    print(f"\n{'='*60}")
+    print(f"Samples compared: {n} ({mb:.1f} MB), mismatched: {mismatched}")
+    print(f"  shards: {t_shard:.2f}s  ({n / max(t_shard, 1e-9):.0f} samples/s, {mb / max(t_shard, 1e-9):.0f} MB/s)")
+    print(f"  loose:  {t_loose:.2f}s  ({n / max(t_loose, 1e-9):.0f} samples/s, {mb / max(t_loose, 1e-9):.0f} MB/s)")
+    print(f"{'='*60}")
+    return mismatched == 0
+
+def main():
+    ap = argparse.ArgumentParser(description="Sequential-read tar shards for YOLO splits.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    w = sub.add_parser("write", help="Pack split_data.py output into shards.")
+    w.add_argument("--split-dir", default="/home/ostikar/MyProjects/CS541/ClashRoyale/data/yolo_dataset")
+    w.add_argument("--out", required=True)
+    w.add_argument("--shard-mb", type=int, default=1024)
+    s = sub.add_parser("stage", help="Unpack shards to local disk for training.")
+    s.add_argument("--shards", required=True)
+    s.add_argument("--out", required=True)
+    s.add_argument("--data", default="data.yaml", help="Base data.yaml (class names).")
+    c = sub.add_parser("compare", help="Shard vs loose-file read throughput and byte equality.")
+    c.add_argument("--shards", required=True)
+    c.add_argument("--split-dir", required=True)
+    c.add_argument("--split", default="train")
+    c.add_argument("--limit", type=int, default=None)
+    args = ap.parse_args()
+
+    if args.cmd == "write":
+        write_shards(Path(args.split_dir), Path(args.out), args.shard_mb)
+        print(f"[DONE] Shards at {args.out}")
+    elif args.cmd == "stage":
+        staged = stage_shards(Path(args.shards), Path(args.out), args.data)
+        print(f"[DONE] Staged dataset: {staged}")
+    else:
+        ok = compare(Path(args.shards), Path(args.split_dir), args.split, args.limit)
+        raise SystemExit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Deterministic --shard i/N work partitioning for Slurm job arrays.
+
+Work is partitioned by game (arena_xx/<game>), never by frame: a game belongs
+to shard md5(key) % N. The hash is stable across machines and Python runs, so
+N array tasks can each take 1/N of the corpus with no coordination, and
+per-game outputs never collide.
+
+Each sharded script also writes its counters to
+runs/shards/<script>/<i>-of-<N>.json; merge sums them:
+
+    python sharding.py merge runs/shards/autolabel
+
+Slurm:
+    #SBATCH --array=0-7
+    python autolabel.py --shard ${SLURM_ARRAY_TASK_ID}/${SLURM_ARRAY_TASK_COUNT}
+"""
+import argparse
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+COUNTERS_DIR = Path('runs/shards')
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """argparse type for 'i/N' (0 <= i < N)."""
+    try:
+        i, n = (int(v) for v in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got '{value}'")
+    if n < 1 or not 0 <= i < n:
+        raise argparse.ArgumentTypeError(f"shard index out of range: '{value}'")
+    return i, n
+
+def add_shard_arg(ap: argparse.ArgumentParser):
+    ap.add_argument("--shard", type=parse_shard, default=(0, 1), metavar="i/N",
+                    help="Process only games in shard i of N (stable hash of arena/game).")
+
+def game_key(path: Path) -> str:
+    """'arena_xx/<game>' for any path inside (or equal to) a game folder."""
+    parts = Path(path).parts
+    for k, p in enumerate(parts[:-1]):
+        if p.startswith('arena_'):
+            return f'{p}/{parts[k + 1]}'
+    return str(path)
+
+def in_shard(key: str, shard: Tuple[int, int]) -> bool:
+    i, n = shard
+    if n == 1:
+        return True
+    return int(hashlib.md5(key.encode()).hexdigest(), 16) % n == i
+
+def select(paths: Iterable[Path], shard: Tuple[int, int]) -> List[Path]:
+    """Keep the paths whose game falls in this shard."""
+    return [p for p in paths if in_shard(game_key(p), shard)]
+
+def write_counters(script: str, shard: Tuple[int, int], counters: Dict[str, int],
+                   out_dir: Path = COUNTERS_DIR) -> Path:
+    path = Path(out_dir) / script / f'{shard[0]}-of-{shard[1]}.json'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(counters, indent=2))
+    return path
+
+def merge_counters(script_dir: Path) -> Dict[str, int]:
+    """Sum per-shard counters; fails if a shard of the array is missing."""
+    files = sorted(Path(script_dir).glob('*-of-*.json'))
+    if not files:
+        raise FileNotFoundError(f"No shard counters in {script_dir}")
+    totals, seen, ns = {}, set(), set()
+    for f in files:
+        i, _, n = f.stem.partition('-of-')
+        seen.add(int(i)); ns.add(int(n))
+        for k, v in json.loads(f.read_text()).items():
+            totals[k] = totals.get(k, 0) + v
+    if len(ns) != 1:
+        raise ValueError(f"Mixed shard counts in {script_dir}: {sorted(ns)}")
+    missing = set(range(ns.pop())) - seen
+    if missing:
+        raise ValueError(f"Missing shards in {script_dir}: {sorted(missing)}")
+    return totals
+
+def main():
+    ap = argparse.ArgumentParser(description="Merge per-shard counters.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    m = sub.add_parser("merge", help="Sum runs/shards/<script>/*.json")
+    m.add_argument("dirs", nargs="+", help="Per-script counter folders.")
+    args = ap.parse_args()
+
+    for d in args.dirs:
+        totals = merge_counters(Path(d))
+        (Path(d) / 'merged.json').write_text(json.dumps(totals, indent=2))
+        print(f"[MERGED] {d}")
+        for k, v in totals.items():
+            print(f"  {k}: {v}")
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,7 @@
 Split the dataset into train/val/test sets and organize for YOLO training.
 Creates a consolidated dataset structure with proper splits.
 """
+import argparse
 import shutil
 from pathlib import Path
 import random
@@ -86,6 +87,10 @@ def create_split_dataset(
             label_dst = output_dir / split_name / 'labels' / label_src.name
             shutil.copy2(img_src, img_dst)
             shutil.copy2(label_src, label_dst)
+        # Record where each image came from (arena/game) for per-arena evaluation
+        with open(output_dir / split_name / 'sources.txt', 'w') as f:
+            for img_src, _ in split_pairs:
+                f.write(f"{img_src.name}\t{img_src}\n")
     
     print("\nCopying files...")
     copy_split(train_pairs, 'train')
@@ -108,8 +113,14 @@ def create_split_dataset(
         json.dump(metadata, f, indent=2)
 
 def main():
-    data_root = Path('/home/ostikar/MyProjects/CS541/ClashRoyale/data')
-    output_dir = Path('/home/ostikar/MyProjects/CS541/ClashRoyale/data/yolo_dataset_health')
+    ap = argparse.ArgumentParser(description="Split labelled arena/game folders into train/val/test.")
+    ap.add_argument("--data-root", default="/home/ostikar/MyProjects/CS541/ClashRoyale/data",
+                    help="Root containing arena_* folders.")
+    ap.add_argument("--out", default="/home/ostikar/MyProjects/CS541/ClashRoyale/data/yolo_dataset_health",
+                    help="Output dataset folder.")
+    args = ap.parse_args()
+    data_root = Path(args.data_root)
+    output_dir = Path(args.out)
     
     print("Collecting all image-label pairs...")
     pairs = collect_all_images(data_root)
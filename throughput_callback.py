@@ -0,0 +1,203 @@
+"""
+Training-loop throughput instrumentation for ultralytics.
+
+Per iteration it records:
+    wait_ms     time blocked on the dataloader (previous batch end -> this batch start)
+    fwd_ms      model forward (timed with forward hooks)
+    step_ms     forward + loss + backward + optimizer
+    img_s       images / (wait + step)
+    rss_mb      host resident memory of the trainer process (needs psutil; without
+                it the process's peak RSS is logged as peak_rss_mb instead)
+    starved     wait_ms > --starve-ms (the next batch was not ready)
+
+Rows go to <save_dir>/throughput.jsonl; every epoch a summary row goes to
+<save_dir>/throughput_epochs.csv, to wandb (if a run is active) and to stdout
+together with which side is limiting. CUDA timings synchronize the device.
+
+Usage:
+    from throughput_callback import add_throughput_callbacks
+    add_throughput_callbacks(model)
+    model.train(...)
+
+CPU smoke run:
+    python throughput_callback.py --data data.yaml --device cpu --fraction 0.01
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+def _rss_mb():
+    """('rss_mb', current RSS) with psutil, else ('peak_rss_mb', peak RSS so far)."""
+    try:
+        import psutil
+        return 'rss_mb', psutil.Process(os.getpid()).memory_info().rss / 2**20
+    except ImportError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        return 'peak_rss_mb', peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+class ThroughputMonitor:
+    def __init__(self, starve_ms: float = 5.0):
+        self.starve_ms = starve_ms
+        self.rows = []
+        self.epoch_rows = []
+        self.fwd_s = 0.0
+        self._fwd_t0 = None
+        self._last_end = None
+        self._batch_t0 = None
+        self._iter = 0
+        self._jsonl = None
+        self._cuda = False
+        self._hooked = False
+
+    def _sync(self):
+        if self._cuda:
+            import torch
+            torch.cuda.synchronize()
+
+    def _pre_forward(self, module, inputs):
+        if module.training:
+            self._sync()
+            self._fwd_t0 = time.perf_counter()
+
+    def _post_forward(self, module, inputs, output):
+        if module.training and self._fwd_t0 is not None:
+            self._sync()
+            self.fwd_s += time.perf_counter() - self._fwd_t0
+            self._fwd_t0 = None
+
+    # ultralytics callbacks
+    def on_train_start(self, trainer):
+        self._cuda = getattr(trainer.device, 'type', 'cpu') == 'cuda'
+        save_dir = Path(trainer.save_dir)
+        save_dir.mkdir(parents=True, exist_ok=True)
+        self._jsonl = open(save_dir / 'throughput.jsonl', 'a')
+        self._csv_path = save_dir / 'throughput_epochs.csv'
+        model = getattr(trainer.model, 'module', trainer.model)
+        if not self._hooked:
+            model.register_forward_pre_hook(self._pre_forward)
+            model.register_forward_hook(self._post_forward)
+            self._hooked = True
+
+    def on_train_epoch_start(self, trainer):
+        self.rows = []
+        self._iter = 0
+        self._last_end = time.perf_counter()
+
+    def on_train_batch_start(self, trainer):
+        now = time.perf_counter()
+        self._wait_s = now - self._last_end
+        self.fwd_s = 0.0
+        self._batch_t0 = now
+
+    def on_train_batch_end(self, trainer):
+        self._sync()
+        now = time.perf_counter()
+        step_s = now - self._batch_t0
+        n = trainer.batch_size
+        mem_key, mem_mb = _rss_mb()
+        row = {
+            'epoch': trainer.epoch,
+            'iter': self._iter,
+            'wait_ms': 1000 * self._wait_s,
+            'fwd_ms': 1000 * self.fwd_s,
+            'step_ms': 1000 * step_s,
+            'img_s': n / max(self._wait_s + step_s, 1e-9),
+            mem_key: mem_mb,
+            'starved': 1000 * self._wait_s > self.starve_ms,
+        }
+        self.rows.append(row)
+        self._jsonl.write(json.dumps(row) + '\n')
+        self._iter += 1
+        self._last_end = time.perf_counter()
+
+    def on_train_epoch_end(self, trainer):
+        # First iteration includes dataloader worker start-up; keep it out of the summary
+        rows = self.rows[1:] or self.rows
+        if not rows:
+            return
+        wait = np.array([r['wait_ms'] for r in rows])
+        step = np.array([r['step_ms'] for r in rows])
+        fwd = np.array([r['fwd_ms'] for r in rows])
+        total = wait.sum() + step.sum()
+        mem_key = 'rss_mb' if 'rss_mb' in rows[0] else 'peak_rss_mb'
+        summary = {
+            'epoch': trainer.epoch,
+            'iters': len(rows),
+            'wait_ms_mean': float(wait.mean()),
+            'wait_ms_p95': float(np.percentile(wait, 95)),
+            'fwd_ms_mean': float(fwd.mean()),
+            'bwd_opt_ms_mean': float((step - fwd).mean()),
+            'step_ms_mean': float(step.mean()),
+            'img_s': float(trainer.batch_size * len(rows) / max(total / 1000, 1e-9)),
+            f'{mem_key}_max': float(max(r[mem_key] for r in rows)),
+            'starved_frac': float(np.mean([r['starved'] for r in rows])),
+            'wait_frac': float(wait.sum() / max(total, 1e-9)),
+        }
+        summary['limiting'] = 'dataloader' if summary['wait_frac'] > 0.5 else 'model step'
+        self.epoch_rows.append(summary)
+        self._jsonl.flush()
+
+        write_header = not self._csv_path.exists()
+        with open(self._csv_path, 'a', newline='') as f:
+            w = csv.DictWriter(f, fieldnames=list(summary))
+            if write_header:
+                w.writeheader()
+            w.writerow(summary)
+
+        try:
+            import wandb
+            if wandb.run is not None:
+                wandb.log({f'throughput/{k}': v for k, v in summary.items() if k != 'limiting'})
+        except ImportError:
+            pass
+
+        print(f"[THROUGHPUT] epoch {summary['epoch']}: {summary['img_s']:.1f} img/s, "
+              f"wait {summary['wait_ms_mean']:.1f} ms ({summary['wait_frac']:.0%} of time, "
+              f"{summary['starved_frac']:.0%} starved), fwd {summary['fwd_ms_mean']:.1f} ms, "
+              f"bwd+opt {summary['bwd_opt_ms_mean']:.1f} ms, "
+              f"{'RSS' if mem_key == 'rss_mb' else 'peak RSS'} {summary[mem_key + '_max']:.0f} MB "
+              f"-> limited by {summary['limiting']}")
+
+    def on_train_end(self, trainer):
+        if self._jsonl is not None:
+            self._jsonl.close()
+            self._jsonl = None
+
+def add_throughput_callbacks(model, starve_ms: float = 5.0) -> ThroughputMonitor:
+    """Attach a ThroughputMonitor to an ultralytics YOLO model."""
+    monitor = ThroughputMonitor(starve_ms)
+    for event in ('on_train_start', 'on_train_epoch_start', 'on_train_batch_start',
+                  'on_train_batch_end', 'on_train_epoch_end', 'on_train_end'):
+        model.add_callback(event, getattr(monitor, event))
+    return monitor
+
+def main():
+    ap = argparse.ArgumentParser(description="Short instrumented training run (smoke test).")
+    ap.add_argument("--model", default="yolo11n.pt")
+    ap.add_argument("--data", default="data.yaml")
+    ap.add_argument("--device", default="cpu")
+    ap.add_argument("--epochs", type=int, default=1)
+    ap.add_argument("--imgsz", type=int, default=320)
+    ap.add_argument("--batch", type=int, default=8)
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--fraction", type=float, default=0.01, help="Fraction of the train split used.")
+    ap.add_argument("--starve-ms", type=float, default=5.0)
+    args = ap.parse_args()
+
+    from ultralytics import YOLO
+    model = YOLO(args.model)
+    add_throughput_callbacks(model, args.starve_ms)
+    model.train(data=args.data, epochs=args.epochs, imgsz=args.imgsz, batch=args.batch,
+                workers=args.workers, device=args.device, fraction=args.fraction,
+                val=False, plots=False, name='throughput_smoke', project='runs/detect')
+
+if __name__ == '__main__':
+    main()
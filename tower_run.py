@@ -1,62 +1,147 @@
-from ultralytics import YOLO
-import wandb
-
-wandb.init(project="clash-royale", name="towers_bars_finetune_v1")
-
-# Load your best tower detection weights
-model = YOLO('runs/detect/tower_detection4/weights/best.pt')
-
-# Fine-tune to also detect health bars
-results = model.train(
-    data='data.yaml',
-    epochs=50,  # Fewer epochs since starting from trained weights
-    imgsz=640,
-    batch=64,  # Increased batch size
-    name='towers_bars_finetune',
-    project='runs/detect',
-    patience=12,  # Early stopping
-    save=True,
-    device=0,
-    workers=8,  # More workers for larger dataset
-    cache='disk',  # More deterministic than 'ram'
-    verbose=True,
-    # Augmentation settings
-    hsv_h=0.015,
-    hsv_s=0.4,
-    hsv_v=0.4,
-    degrees=0.0,  # No rotation (UI is always upright)
-    translate=0.05,  # Slight translation
-    scale=0.3,  # Some scale variation
-    fliplr=0.0,  # No horizontal flip (asymmetric game)
-    flipud=0.0,  # No vertical flip
-    mosaic=0.8,  # Reduced mosaic for cleaner training
-    mixup=0.0,
-    copy_paste=0.0,
-)
-
-# Validate the model
-metrics = model.val()
-
-# Test on held-out test set
-test_metrics = model.val(split='test')
-
-print(f"\n{'='*60}")
-print(f"Fine-tuning complete!")
-print(f"Best model: {model.trainer.best}")
-print(f"\nValidation Metrics:")
-print(f"  mAP50: {metrics.box.map50:.4f}")
-print(f"  mAP50-95: {metrics.box.map:.4f}")
-print(f"\nTest Metrics:")
-print(f"  mAP50: {test_metrics.box.map50:.4f}")
-print(f"  mAP50-95: {test_metrics.box.map:.4f}")
-
-# Per-class metrics
-class_names = ['king', 'princess', 'unused_2', 'unused_3', 'health_bar']
-print(f"\nPer-class mAP50:")
-for i, name in enumerate(class_names):
-    if i < len(test_metrics.box.maps) and test_metrics.box.maps[i] > 0:
-        print(f"  {name}: {test_metrics.box.maps[i]:.4f}")
-
-print(f"{'='*60}")
-
-wandb.finish()
\ No newline at end of file
+import argparse
+import os
+from pathlib import Path
+
+# Dataset config; point at <out>/hard_data.yaml from mine_hard_examples.py to
+# fine-tune on the hard frames + random reservoir only
+DATA = 'data.yaml'
+WEIGHTS = 'runs/detect/tower_detection4/weights/best.pt'
+
+# Optional tar shards from shard_dataset.py: unpacked sequentially to node-local
+# disk (e.g. $TMPDIR) before training instead of random reads on the shared FS
+SHARDS = None
+STAGE_DIR = os.environ.get('TMPDIR', '/tmp') + '/yolo_dataset'
+
+# Optional pre-letterboxed memmap cache from train_cache.py (None = decode from disk)
+TRAIN_CACHE = None
+# Train/validate at a fixed portrait shape (e.g. 384x672) instead of square 640
+ASPECT = False
+ASPECT_LONG_SIDE = 672
+
+def main():
+    ap = argparse.ArgumentParser(description="Fine-tune the tower detector to also detect health bars.")
+    ap.add_argument("--data", default=DATA)
+    ap.add_argument("--weights", default=WEIGHTS, help="Starting weights.")
+    ap.add_argument("--shards", default=SHARDS, help="shard_dataset.py output to stage before training.")
+    ap.add_argument("--stage-dir", default=STAGE_DIR)
+    ap.add_argument("--train-cache", default=TRAIN_CACHE, help="train_cache.py output folder.")
+    ap.add_argument("--aspect", action="store_true", default=ASPECT, help="Fixed portrait input shape.")
+    ap.add_argument("--aspect-long-side", type=int, default=ASPECT_LONG_SIDE)
+    ap.add_argument("--wandb-project", default="clash-royale")
+    ap.add_argument("--run-name", default="towers_bars_finetune_v1")
+    args = ap.parse_args()
+
+    # Heavy imports only once we actually train
+    from ultralytics import YOLO
+    import wandb
+    import yaml
+
+    from pred_cache import IOU_THRESHOLDS, cache_predictions, evaluate, load_cache, match, mean_ap
+    from throughput_callback import add_throughput_callbacks
+
+    wandb.init(project=args.wandb_project, name=args.run_name)
+
+    data = args.data
+    if args.shards:
+        from shard_dataset import stage_shards
+        data = str(stage_shards(Path(args.shards), Path(args.stage_dir), data))
+
+    imgsz = 640
+    predict_imgsz = imgsz
+    train_kwargs = {}
+    if args.train_cache and args.aspect:
+        raise ValueError("--train-cache holds square letterboxed frames; it cannot be combined with --aspect")
+    if args.train_cache:
+        from train_cache import make_cached_trainer
+        train_kwargs['trainer'] = make_cached_trainer(args.train_cache)
+    if args.aspect:
+        from aspect_mode import data_shape
+        # Rect train batches at imgsz=long side come out at exactly this shape;
+        # final val/test predictions use it explicitly
+        shape = data_shape(data, 'train', args.aspect_long_side)
+        print(f"Portrait input shape (H x W): {shape}")
+        imgsz = args.aspect_long_side
+        predict_imgsz = list(shape)
+        train_kwargs['rect'] = True
+
+    # Load your best tower detection weights
+    model = YOLO(args.weights)
+
+    # Dataloader vs model-step timing -> <save_dir>/throughput.jsonl, throughput_epochs.csv and wandb
+    add_throughput_callbacks(model)
+
+    # Fine-tune to also detect health bars
+    results = model.train(
+        data=data,
+        epochs=50,  # Fewer epochs since starting from trained weights
+        imgsz=imgsz,
+        batch=64,  # Increased batch size
+        name='towers_bars_finetune',
+        project='runs/detect',
+        patience=12,  # Early stopping
+        save=True,
+        device=0,
+        workers=8,  # More workers for larger dataset
+        cache=False if args.train_cache else 'disk',  # More deterministic than 'ram'
+        verbose=True,
+        # Augmentation settings
+        hsv_h=0.015,
+        hsv_s=0.4,
+        hsv_v=0.4,
+        degrees=0.0,  # No rotation (UI is always upright)
+        translate=0.05,  # Slight translation
+        scale=0.3,  # Some scale variation
+        fliplr=0.0,  # No horizontal flip (asymmetric game)
+        flipud=0.0,  # No vertical flip
+        mosaic=0.8,  # Reduced mosaic for cleaner training
+        mixup=0.0,
+        copy_paste=0.0,
+        **train_kwargs,
+    )
+
+    data_cfg = yaml.safe_load(Path(data).read_text())
+    save_dir = Path(model.trainer.save_dir)
+
+    # Validate the model. Ultralytics rect val pads half a stride on both sides
+    # (704x416 for 672x384), so with --aspect score val at the trained shape instead
+    if args.aspect:
+        val_cache = cache_predictions(model.trainer.best, [Path(data_cfg['path']) / data_cfg['val']],
+                                      save_dir / 'val_preds.npz', imgsz=predict_imgsz)
+        cache = load_cache(val_cache)
+        val_map50, val_map = mean_ap(evaluate(cache, match(cache, IOU_THRESHOLDS)))
+    else:
+        metrics = model.val(imgsz=imgsz, rect=True)
+        val_map50, val_map = metrics.box.map50, metrics.box.map
+
+    # Test on held-out test set: cache detections once, then evaluate offline
+    # (re-slice later with: python pred_cache.py eval --cache <cache> --by arena)
+    test_cache = cache_predictions(model.trainer.best, [Path(data_cfg['path']) / data_cfg['test']],
+                                   save_dir / 'test_preds.npz', imgsz=predict_imgsz)
+    cache = load_cache(test_cache)
+    test_results = evaluate(cache, match(cache, IOU_THRESHOLDS))
+    test_map50, test_map = mean_ap(test_results)
+
+    print(f"\n{'='*60}")
+    print(f"Fine-tuning complete!")
+    print(f"Best model: {model.trainer.best}")
+    print(f"\nValidation Metrics:")
+    print(f"  mAP50: {val_map50:.4f}")
+    print(f"  mAP50-95: {val_map:.4f}")
+    print(f"\nTest Metrics:")
+    print(f"  mAP50: {test_map50:.4f}")
+    print(f"  mAP50-95: {test_map:.4f}")
+
+    # Per-class metrics
+    class_names = ['king', 'princess', 'unused_2', 'unused_3', 'health_bar']
+    print(f"\nPer-class mAP50:")
+    for i, name in enumerate(class_names):
+        if i in test_results and test_results[i]['n_gt'] > 0:
+            print(f"  {name}: {test_results[i]['ap'][0]:.4f}")
+    print(f"Test predictions cached at: {test_cache}")
+
+    print(f"{'='*60}")
+
+    wandb.finish()
+
+if __name__ == '__main__':
+    main()
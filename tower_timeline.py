@@ -0,0 +1,252 @@
+"""
+Per-game tower-state timelines straight from frames.parquet.
+
+Streams every frames.parquet (no PNG extraction) and, for each frame,
+measures at the known ROIs:
+
+    <tower>_sim       normalized correlation of the tower ROI with the same ROI
+                      at the start of the game (towers are intact then)
+    <tower>_present   <tower>_sim >= --present-thr
+    <bar>_fill        fraction of bar-colored columns (data_cleaner HSV check,
+                      vectorized over the whole batch)
+    <bar>_present     data_cleaner.bar_present decision
+    det_<tower>       optional: 1/0 if the detector found that tower every
+                      --detector-every frames, NaN in between
+
+One parquet per game is written to <out>/<arena>/<game>.parquet (atomically);
+games whose output exists are skipped, so an interrupted run resumes where it
+stopped. Games run in a process pool and support --shard i/N. The detector
+checks run in the parent process with one model (batched over the picked
+frames), so the workers never touch the GPU.
+
+If the parquet was repacked with ROI crop columns (repack_parquet.py --rois),
+only those small columns are read instead of full frames.
+
+Usage:
+    python tower_timeline.py --root hf_subset --rois data/towers/rois.json \\
+        --bar-rois data/towers3cls/bar_rois.json --out timelines
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from data_cleaner import bar_fill_batch
+from extract_parquet_png import find_parquets
+from sharding import add_shard_arg, game_key, select
+
+SIM_SIZE = (24, 24)  # towers are compared at this (w, h)
+
+def _cell_bytes(cell):
+    if isinstance(cell, dict) and "bytes" in cell:
+        return cell["bytes"]
+    return cell
+
+def _decode(raw: bytes) -> Optional[np.ndarray]:
+    if raw is None:
+        return None
+    return cv2.imdecode(np.frombuffer(raw, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+def _crop(img: np.ndarray, roi: List[float]) -> np.ndarray:
+    H, W = img.shape[:2]
+    return img[int(roi[1] * H):int(roi[3] * H), int(roi[0] * W):int(roi[2] * W)]
+
+def _stack(crops: List[Optional[np.ndarray]], size) -> np.ndarray:
+    """Resize crops of one ROI to a common (w, h) so they can be stacked."""
+    out = np.zeros((len(crops), size[1], size[0], 3), dtype=np.uint8)
+    for i, c in enumerate(crops):
+        if c is not None and c.size:
+            out[i] = c if (c.shape[1], c.shape[0]) == size else cv2.resize(c, size, interpolation=cv2.INTER_AREA)
+    return out
+
+def _tower_vectors(stack: np.ndarray) -> np.ndarray:
+    """Zero-mean, unit-norm grayscale vectors for normalized correlation."""
+    gray = stack.astype(np.float32).mean(axis=-1).reshape(len(stack), -1)
+    gray -= gray.mean(axis=1, keepdims=True)
+    return gray / np.maximum(np.linalg.norm(gray, axis=1, keepdims=True), 1e-6)
+
+def _detect(model, frames: List[np.ndarray], towers: Dict[str, List[float]], device, batch: int = 32) -> np.ndarray:
+    """(n_frames, n_towers) 1.0 where a box overlaps the tower ROI (IoU >= 0.3)."""
+    rois = np.array(list(towers.values()), dtype=np.float32)
+    out = np.zeros((len(frames), len(rois)), dtype=np.float32)
+    for i, r in enumerate(model.predict(frames, conf=0.25, device=device, batch=batch, stream=True,
+                                        verbose=False)):
+        boxes = r.boxes.xyxyn.cpu().numpy()
+        if not len(boxes):
+            continue
+        iw = np.clip(np.minimum(rois[:, None, 2], boxes[None, :, 2]) - np.maximum(rois[:, None, 0], boxes[None, :, 0]), 0, None)
+        ih = np.clip(np.minimum(rois[:, None, 3], boxes[None, :, 3]) - np.maximum(rois[:, None, 1], boxes[None, :, 1]), 0, None)
+        inter = iw * ih
+        area_r = (rois[:, 2] - rois[:, 0]) * (rois[:, 3] - rois[:, 1])
+        area_b = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        iou = inter / (area_r[:, None] + area_b[None, :] - inter)
+        out[i] = (iou.max(axis=1) >= 0.3)
+    return out
+
+def detector_columns(model, parquet_path: Path, towers: Dict[str, List[float]], every: int,
+                     image_col: str = 'image', batch_size: int = 256, device=0) -> Dict[str, np.ndarray]:
+    """det_<tower> columns: detector check on every `every`-th frame, NaN in between."""
+    pf = pq.ParquetFile(str(parquet_path))
+    n_rows = pf.metadata.num_rows
+    det = np.full((n_rows, len(towers)), np.nan, dtype=np.float32)
+    row_base = 0
+    for batch in pf.iter_batches(batch_size=batch_size, columns=[image_col]):
+        col = batch.column(image_col)
+        picks, frames = [], []
+        for i in range(-row_base % every, batch.num_rows, every):
+            frame = _decode(_cell_bytes(col[i].as_py()))
+            if frame is not None:
+                picks.append(row_base + i)
+                frames.append(frame)
+        if frames:
+            det[picks] = _detect(model, frames, towers, device)
+        row_base += batch.num_rows
+    return {f'det_{n}': det[:, k] for k, n in enumerate(towers)}
+
+def write_timeline(table: pa.Table, out_path: Path):
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_suffix('.tmp')
+    pq.write_table(table, str(tmp))
+    os.replace(tmp, out_path)
+
+def game_timeline(parquet_path: Path, towers: Dict[str, List[float]], bars: Dict[str, List[float]],
+                  image_col: str = 'image', batch_size: int = 256, ref_frames: int = 8,
+                  present_thr: float = 0.5) -> pa.Table:
+    pf = pq.ParquetFile(str(parquet_path))
+    names = pf.schema_arrow.names
+    crop_cols = {n: f'roi_{n}' for n in list(towers) + list(bars)}
+    use_crops = all(c in names for c in crop_cols.values())
+    columns = list(crop_cols.values()) if use_crops else [image_col]
+
+    # Bars keep their native pixel size; read it from the first decodable frame
+    sizes = {}
+    ref = {}
+    cols = {'frame_idx': []}
+    for n in towers:
+        cols[f'{n}_sim'] = []; cols[f'{n}_present'] = []
+    for n in bars:
+        cols[f'{n}_fill'] = []; cols[f'{n}_present'] = []
+
+    row_base = 0
+    for batch in pf.iter_batches(batch_size=batch_size, columns=columns):
+        n_rows = batch.num_rows
+        crops = {}
+        if use_crops:
+            for n, c in crop_cols.items():
+                crops[n] = [_decode(v) for v in batch.column(c).to_pylist()]
+        else:
+            frames = [_decode(_cell_bytes(v)) for v in batch.column(image_col).to_pylist()]
+            for n, roi in {**towers, **bars}.items():
+                crops[n] = [_crop(f, roi) if f is not None else None for f in frames]
+        for n in bars:
+            if n not in sizes:
+                first = next((c for c in crops[n] if c is not None and c.size), None)
+                if first is not None:
+                    sizes[n] = (first.shape[1], first.shape[0])
+
+        cols['frame_idx'].append(np.arange(row_base, row_base + n_rows, dtype=np.int32))
+        for n in towers:
+            vec = _tower_vectors(_stack(crops[n], SIM_SIZE))
+            if n not in ref:
+                ref[n] = vec[:ref_frames].mean(axis=0)
+                ref[n] /= max(np.linalg.norm(ref[n]), 1e-6)
+            sim = vec @ ref[n]
+            cols[f'{n}_sim'].append(sim.astype(np.float16))
+            cols[f'{n}_present'].append(sim >= present_thr)
+        for n in bars:
+            if n not in sizes:
+                fill, present = np.zeros(n_rows), np.zeros(n_rows, dtype=bool)
+            else:
+                fill, present = bar_fill_batch(_stack(crops[n], sizes[n]))
+            cols[f'{n}_fill'].append(fill.astype(np.float16))
+            cols[f'{n}_present'].append(present)
+        row_base += n_rows
+
+    return pa.table({k: np.concatenate(v) if v else np.zeros(0) for k, v in cols.items()})
+
+def _job(args):
+    parquet_path, out_path, kwargs = args
+    return parquet_path, out_path, game_timeline(Path(parquet_path), **kwargs)
+
+def load_rois(arena: str, rois_root: Optional[Path], default_towers: Dict, default_bars: Dict):
+    """Per-arena calibrated ROIs (calibrate_rois.py) when present, else the defaults."""
+    towers, bars = default_towers, default_bars
+    if rois_root is not None:
+        if (rois_root / arena / 'rois.json').exists():
+            towers = json.loads((rois_root / arena / 'rois.json').read_text())
+        if (rois_root / arena / 'bar_rois.json').exists():
+            bars = json.loads((rois_root / arena / 'bar_rois.json').read_text())
+    valid = lambda r: r and r[2] > r[0] and r[3] > r[1]
+    return ({k: v for k, v in towers.items() if valid(v)},
+            {k: v for k, v in bars.items() if valid(v)})
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-game tower presence / health-bar timelines from parquets.")
+    ap.add_argument("--root", default="/home/ostikar/MyProjects/CS541/ClashRoyale/hf_subset",
+                    help="Root containing arena_*/<game>/frames.parquet.")
+    ap.add_argument("--parquet-name", default="frames.parquet")
+    ap.add_argument("--image-col", default="image")
+    ap.add_argument("--rois", default="/home/ostikar/MyProjects/CS541/ClashRoyale/data/towers/rois.json")
+    ap.add_argument("--bar-rois", default="/home/ostikar/MyProjects/CS541/ClashRoyale/data/towers3cls/bar_rois.json")
+    ap.add_argument("--arena-rois-root", default=None,
+                    help="Data root with per-arena rois.json/bar_rois.json from calibrate_rois.py.")
+    ap.add_argument("--out", default="/home/ostikar/MyProjects/CS541/ClashRoyale/timelines")
+    ap.add_argument("--batch-size", type=int, default=256)
+    ap.add_argument("--present-thr", type=float, default=0.5, help="Tower similarity counted as present.")
+    ap.add_argument("--detector", default=None, help="Optional YOLO weights for periodic checks.")
+    ap.add_argument("--detector-every", type=int, default=0, help="Run the detector every N frames (0 = off).")
+    ap.add_argument("--device", default=0)
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    add_shard_arg(ap)
+    args = ap.parse_args()
+    if args.detector_every and not args.detector:
+        ap.error("--detector-every needs --detector")
+
+    towers = json.loads(Path(args.rois).read_text())
+    bars = json.loads(Path(args.bar_rois).read_text()) if Path(args.bar_rois).exists() else {}
+    rois_root = Path(args.arena_rois_root) if args.arena_rois_root else None
+    out_root = Path(args.out)
+
+    jobs, done = [], 0
+    game_towers = {}
+    for p in select(find_parquets(Path(args.root), args.parquet_name), args.shard):
+        out_path = out_root / f'{game_key(p)}.parquet'
+        if out_path.exists():
+            done += 1
+            continue
+        arena_towers, arena_bars = load_rois(game_key(p).split('/')[0], rois_root, towers, bars)
+        kwargs = dict(towers=arena_towers, bars=arena_bars, image_col=args.image_col,
+                      batch_size=args.batch_size, present_thr=args.present_thr)
+        jobs.append((str(p), str(out_path), kwargs))
+        game_towers[str(p)] = arena_towers
+    print(f"[INFO] {len(jobs)} games to process, {done} already done (resuming)")
+
+    model = None
+    if args.detector_every:
+        from ultralytics import YOLO
+        model = YOLO(args.detector)
+
+    total = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(_job, j) for j in jobs]
+        for fut in as_completed(futures):
+            path, out_path, table = fut.result()
+            if model is not None:
+                det = detector_columns(model, Path(path), game_towers[path], args.detector_every,
+                                       args.image_col, args.batch_size, args.device)
+                for name, values in det.items():
+                    table = table.append_column(name, pa.array(values))
+            write_timeline(table, Path(out_path))
+            total += table.num_rows
+            print(f"[DONE] {path}: {table.num_rows} frames")
+    print(f"[TOTAL] {total} frames across {len(jobs)} games -> {out_root}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+"""
+Build a pre-letterboxed training cache and train from it.
+
+Every frame of a split (output of split_data.py) is decoded and letterboxed
+once to imgsz x imgsz, and written into a single uint8 memory-mapped array:
+
+    <out>/images.u8     raw (N, imgsz, imgsz, 3) BGR array
+    <out>/labels.npy    (M, 6) float32 rows: image index, class, cx, cy, w, h
+                        (normalized to the letterboxed image)
+    <out>/index.json    imgsz, count, image paths, original shapes
+
+Dataloader workers map the same file read-only, so the page cache holds a
+single copy no matter how many workers or how large the batch; there is no
+per-epoch PNG decode or resize.
+
+Usage:
+    python train_cache.py --split-dir data/yolo_dataset/train --out data/yolo_dataset/train_cache
+and set TRAIN_CACHE in tower_run.py to the output folder.
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+PAD_VALUE = 114  # ultralytics letterbox fill
+
+def letterbox(img: np.ndarray, size: int) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """Resize the long side to size and pad to a square. Returns (img, ratio, (padx, pady))."""
+    h, w = img.shape[:2]
+    r = size / max(h, w)
+    nw, nh = int(round(w * r)), int(round(h * r))
+    if (nw, nh) != (w, h):
+        img = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_AREA if r < 1 else cv2.INTER_LINEAR)
+    padx, pady = (size - nw) // 2, (size - nh) // 2
+    out = np.full((size, size, 3), PAD_VALUE, dtype=np.uint8)
+    out[pady:pady + nh, padx:padx + nw] = img
+    return out, r, (padx, pady)
+
+def rescale_labels(rows: np.ndarray, shape: Tuple[int, int], r: float,
+                   pad: Tuple[int, int], size: int) -> np.ndarray:
+    """Map normalized (cls, cx, cy, w, h) rows from the original frame to the letterboxed one."""
+    h, w = shape
+    out = rows.copy()
+    out[:, 1] = (rows[:, 1] * w * r + pad[0]) / size
+    out[:, 2] = (rows[:, 2] * h * r + pad[1]) / size
+    out[:, 3] = rows[:, 3] * w * r / size
+    out[:, 4] = rows[:, 4] * h * r / size
+    return out
+
+def read_label(path: Path) -> np.ndarray:
+    if not path.exists():
+        return np.zeros((0, 5), dtype=np.float32)
+    rows = [ln.split()[:5] for ln in path.read_text().splitlines() if len(ln.split()) >= 5]
+    return np.array(rows, dtype=np.float32).reshape(-1, 5)
+
+def _fill_chunk(args):
+    """Worker: letterbox a chunk of images directly into the shared memmap."""
+    mm_path, count, size, start, items = args
+    arr = np.memmap(mm_path, dtype=np.uint8, mode='r+', shape=(count, size, size, 3))
+    shapes, labels = [], []
+    for k, (img_path, lbl_path) in enumerate(items):
+        i = start + k
+        img = cv2.imread(str(img_path))
+        if img is None:
+            print(f"[WARN] Could not read {img_path}, filling with padding")
+            arr[i] = PAD_VALUE
+            shapes.append((0, 0))
+            continue
+        arr[i], r, pad = letterbox(img, size)
+        shapes.append(img.shape[:2])
+        rows = read_label(Path(lbl_path))
+        if len(rows):
+            rows = rescale_labels(rows, img.shape[:2], r, pad, size)
+            labels.append(np.hstack([np.full((len(rows), 1), i, dtype=np.float32), rows]))
+    arr.flush()
+    return start, shapes, labels
+
+def build_cache(split_dir: Path, out_dir: Path, imgsz: int = 640, workers: int = 8,
+                chunk: int = 256) -> int:
+    images = sorted(list((split_dir / 'images').glob('*.png')) + list((split_dir / 'images').glob('*.jpg')))
+    if not images:
+        print(f"[WARN] No images under {split_dir / 'images'}")
+        return 0
+    out_dir.mkdir(parents=True, exist_ok=True)
+    mm_path = out_dir / 'images.u8'
+    count = len(images)
+    np.memmap(mm_path, dtype=np.uint8, mode='w+', shape=(count, imgsz, imgsz, 3)).flush()
+
+    items = [(p, split_dir / 'labels' / f'{p.stem}.txt') for p in images]
+    jobs = [(str(mm_path), count, imgsz, s, items[s:s + chunk]) for s in range(0, count, chunk)]
+    shapes: List[Tuple[int, int]] = [(0, 0)] * count
+    labels = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for start, chunk_shapes, chunk_labels in pool.map(_fill_chunk, jobs):
+            shapes[start:start + len(chunk_shapes)] = chunk_shapes
+            labels.extend(chunk_labels)
+
+    all_labels = np.concatenate(labels) if labels else np.zeros((0, 6), dtype=np.float32)
+    all_labels = all_labels[np.argsort(all_labels[:, 0], kind='stable')]
+    np.save(out_dir / 'labels.npy', all_labels)
+    (out_dir / 'index.json').write_text(json.dumps({
+        'imgsz': imgsz,
+        'count': count,
+        'im_files': [str(p) for p in images],
+        'shapes': shapes,
+    }))
+    return count
+
+class TrainCache:
+    """Read-only view of a cache folder; the memmap is opened lazily per process."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        index = json.loads((self.cache_dir / 'index.json').read_text())
+        self.imgsz = index['imgsz']
+        self.count = index['count']
+        self.im_files = index['im_files']
+        self.shapes = index['shapes']
+        self._labels = np.load(self.cache_dir / 'labels.npy')
+        self._images = None
+
+    def __getstate__(self):
+        # Don't pickle the mapped pages into spawned dataloader workers
+        state = self.__dict__.copy()
+        state['_images'] = None
+        return state
+
+    @property
+    def images(self) -> np.ndarray:
+        if self._images is None:
+            self._images = np.memmap(self.cache_dir / 'images.u8', dtype=np.uint8, mode='r',
+                                     shape=(self.count, self.imgsz, self.imgsz, 3))
+        return self._images
+
+    def labels(self):
+        """Labels in the ultralytics YOLODataset dict format."""
+        bounds = np.searchsorted(self._labels[:, 0], np.arange(self.count + 1))
+        out = []
+        for i, f in enumerate(self.im_files):
+            rows = self._labels[bounds[i]:bounds[i + 1]]
+            out.append({
+                'im_file': f,
+                'shape': (self.imgsz, self.imgsz),
+                'cls': rows[:, 1:2].astype(np.float32),
+                'bboxes': rows[:, 2:6].astype(np.float32),
+                'segments': [],
+                'keypoints': None,
+                'normalized': True,
+                'bbox_format': 'xywh',
+            })
+        return out
+
+def make_cached_trainer(cache_dir):
+    """
+    DetectionTrainer subclass whose training split is served from the cache.
+    Validation keeps the regular (rect) dataset.
+    """
+    from ultralytics.data import YOLODataset
+    from ultralytics.models.yolo.detect import DetectionTrainer
+    from ultralytics.utils import colorstr
+
+    class CachedYOLODataset(YOLODataset):
+        def __init__(self, train_cache, *args, **kwargs):
+            # Not self.cache: BaseDataset.__init__ overwrites that with the cache mode
+            self.train_cache = train_cache  # needed by get_img_files/get_labels during super().__init__
+            super().__init__(*args, **kwargs)
+
+        def get_img_files(self, img_path):
+            return list(self.train_cache.im_files)
+
+        def get_labels(self):
+            return self.train_cache.labels()
+
+        def load_image(self, i, rect_mode=True, **kwargs):
+            if self.ims[i] is not None:
+                return self.ims[i], self.im_hw0[i], self.im_hw[i]
+            # Copy one frame out of the shared mapping: augmentations write in place
+            im = np.array(self.train_cache.images[i])
+            hw = im.shape[:2]
+            # Same mosaic buffer bookkeeping as BaseDataset.load_image
+            if self.augment:
+                self.ims[i], self.im_hw0[i], self.im_hw[i] = im, hw, hw
+                self.buffer.append(i)
+                if 1 < len(self.buffer) >= self.max_buffer_length:
+                    j = self.buffer.pop(0)
+                    self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+            return im, hw, hw
+
+    class CachedDetectionTrainer(DetectionTrainer):
+        def build_dataset(self, img_path, mode="train", batch=None):
+            if mode != "train":
+                return super().build_dataset(img_path, mode, batch)
+            cache = TrainCache(cache_dir)
+            if cache.imgsz != self.args.imgsz:
+                raise ValueError(f"Cache built for imgsz={cache.imgsz}, training with imgsz={self.args.imgsz}")
+            model = getattr(self.model, 'module', self.model)
+            gs = max(int(model.stride.max() if model else 0), 32)
+            return CachedYOLODataset(
+                cache,
+                img_path=img_path,
+                imgsz=self.args.imgsz,
+                batch_size=batch,
+                augment=True,
+                hyp=self.args,
+                rect=False,
+                cache=None,
+                single_cls=self.args.single_cls or False,
+                stride=gs,
+                pad=0.0,
+                prefix=colorstr("train: "),
+                task=self.args.task,
+                classes=self.args.classes,
+                data=self.data,
+                fraction=1.0,
+            )
+
+    return CachedDetectionTrainer
+
+def main():
+    ap = argparse.ArgumentParser(description="Letterbox a split once into a shared memmap training cache.")
+    ap.add_argument("--split-dir", default="/home/ostikar/MyProjects/CS541/ClashRoyale/data/yolo_dataset/train",
+                    help="Split folder with images/ and labels/.")
+    ap.add_argument("--out", default=None, help="Cache folder (default: <split-dir>_cache).")
+    ap.add_argument("--imgsz", type=int, default=640)
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    args = ap.parse_args()
+
+    split_dir = Path(args.split_dir)
+    out_dir = Path(args.out) if args.out else split_dir.with_name(split_dir.name + '_cache')
+    n = build_cache(split_dir, out_dir, args.imgsz, args.workers)
+    size_gb = n * args.imgsz * args.imgsz * 3 / 1e9
+    print(f"[DONE] Cached {n} images ({size_gb:.2f} GB) at {out_dir}")
+
+if __name__ == '__main__':
+    main()
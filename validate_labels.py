@@ -0,0 +1,202 @@
+"""
+Validate (and optionally repair) YOLO label files in bulk.
+
+Label files are parsed chunk by chunk in a process pool; each chunk becomes
+one NumPy array so every check runs vectorized:
+
+    malformed      line without exactly 5 numeric fields
+    unknown_class  class id not in data.yaml names
+    degenerate     width or height <= --min-size (e.g. the zero-area king_top ROI)
+    out_of_bounds  box extends outside [0, 1]
+    duplicate      same class and coordinates within --dup-tol
+                   (e.g. an autolabel_bars line re-added with other float formatting)
+    overlap        same-class boxes with IoU >= --overlap-iou (reported only)
+
+Outputs a summary on stdout and a JSONL report (one issue per line). With
+--fix, files are rewritten: malformed, unknown, degenerate and duplicate
+lines are dropped, out-of-bounds boxes are clipped to the frame.
+
+Usage:
+    python validate_labels.py --root data --report label_report.jsonl [--fix]
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import yaml
+
+ISSUES = ['malformed', 'unknown_class', 'degenerate', 'out_of_bounds', 'duplicate', 'overlap']
+
+def find_label_files(root: Path) -> List[str]:
+    """All *.txt under any labels/ folder below root (os.scandir, no stat per file)."""
+    files = []
+    stack = [str(root)]
+    while stack:
+        d = stack.pop()
+        try:
+            it = os.scandir(d)
+        except OSError:
+            continue
+        with it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    stack.append(e.path)
+                elif e.name.endswith('.txt') and os.path.basename(d) == 'labels':
+                    files.append(e.path)
+    return sorted(files)
+
+def _pairs_within_files(file_idx: np.ndarray):
+    """All (i, j), i < j, row pairs that share a file; rows are sorted by file."""
+    starts = np.flatnonzero(np.r_[True, file_idx[1:] != file_idx[:-1]])
+    sizes = np.diff(np.r_[starts, len(file_idx)])
+    pi, pj = [], []
+    for k in np.unique(sizes[sizes > 1]):
+        base = starts[sizes == k][:, None]
+        a, b = np.triu_indices(k, 1)
+        pi.append((base + a).ravel()); pj.append((base + b).ravel())
+    if not pi:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64)
+    return np.concatenate(pi), np.concatenate(pj)
+
+def check_chunk(args):
+    """
+    Worker: parse and check a chunk of label files.
+    Returns (issues, fixes) where fixes maps file -> new text (only with fix=True).
+    """
+    files, n_classes, min_size, dup_tol, overlap_iou, fix = args
+    file_idx, line_idx, rows = [], [], []
+    issues = []
+    unreadable = set()
+    for fi, path in enumerate(files):
+        try:
+            text = Path(path).read_text()
+        except (OSError, ValueError) as e:  # ValueError covers UnicodeDecodeError
+            issues.append({'file': path, 'line': None, 'issue': 'malformed', 'detail': str(e)})
+            unreadable.add(path)
+            continue
+        for li, ln in enumerate(text.splitlines()):
+            parts = ln.split()
+            if not parts:
+                continue
+            try:
+                vals = [float(v) for v in parts]
+            except ValueError:
+                vals = []
+            if len(vals) != 5:
+                issues.append({'file': path, 'line': li, 'issue': 'malformed', 'detail': ln.strip()})
+                continue
+            file_idx.append(fi); line_idx.append(li); rows.append(vals)
+
+    file_idx = np.array(file_idx, dtype=np.int64)
+    line_idx = np.array(line_idx, dtype=np.int64)
+    arr = np.array(rows, dtype=np.float64).reshape(-1, 5)
+    cls, cx, cy, w, h = arr.T
+    x1, y1, x2, y2 = cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2
+
+    flags = {
+        'unknown_class': (cls != np.round(cls)) | (cls < 0) | (cls >= n_classes),
+        'degenerate': (w <= min_size) | (h <= min_size),
+        'out_of_bounds': (x1 < -1e-6) | (y1 < -1e-6) | (x2 > 1 + 1e-6) | (y2 > 1 + 1e-6),
+    }
+
+    # Duplicates: same file, class and quantized coordinates; first occurrence is kept
+    q = np.round(arr[:, 1:] / dup_tol).astype(np.int64)
+    key = np.column_stack([file_idx, arr[:, 0].astype(np.int64), q])
+    _, first = np.unique(key, axis=0, return_index=True)
+    dup = np.ones(len(arr), dtype=bool)
+    dup[first] = False
+    flags['duplicate'] = dup
+
+    # Heavy overlap between distinct same-class boxes of one file
+    overlap = np.zeros(len(arr), dtype=bool)
+    pi, pj = _pairs_within_files(file_idx)
+    if len(pi):
+        same = (cls[pi] == cls[pj]) & ~dup[pi] & ~dup[pj]
+        pi, pj = pi[same], pj[same]
+        iw = np.clip(np.minimum(x2[pi], x2[pj]) - np.maximum(x1[pi], x1[pj]), 0, None)
+        ih = np.clip(np.minimum(y2[pi], y2[pj]) - np.maximum(y1[pi], y1[pj]), 0, None)
+        inter = iw * ih
+        union = w[pi] * h[pi] + w[pj] * h[pj] - inter
+        hit = inter / np.maximum(union, 1e-12) >= overlap_iou
+        overlap[pi[hit]] = True; overlap[pj[hit]] = True
+    flags['overlap'] = overlap
+
+    for name, mask in flags.items():
+        for r in np.flatnonzero(mask):
+            issues.append({'file': files[file_idx[r]], 'line': int(line_idx[r]), 'issue': name,
+                           'detail': ' '.join(f'{v:g}' for v in arr[r])})
+
+    fixes = {}
+    if fix:
+        # Files that could not be read are reported only; rewriting them would truncate them
+        touched = {i['file'] for i in issues if i['issue'] != 'overlap'} - unreadable
+        drop = flags['unknown_class'] | flags['degenerate'] | flags['duplicate']
+        cx1, cy1 = np.clip(x1, 0, 1), np.clip(y1, 0, 1)
+        cx2, cy2 = np.clip(x2, 0, 1), np.clip(y2, 0, 1)
+        drop |= ((cx2 - cx1) <= min_size) | ((cy2 - cy1) <= min_size)
+        out = {f: [] for f in touched}
+        for r in range(len(arr)):
+            f = files[file_idx[r]]
+            if f not in out or drop[r]:
+                continue
+            if flags['out_of_bounds'][r]:
+                vals = ((cx1[r] + cx2[r]) / 2, (cy1[r] + cy2[r]) / 2, cx2[r] - cx1[r], cy2[r] - cy1[r])
+            else:
+                vals = (cx[r], cy[r], w[r], h[r])
+            out[f].append(f"{int(cls[r])} " + ' '.join(f'{v:.6f}' for v in vals))
+        fixes = {f: ('\n'.join(lines) + '\n') if lines else '' for f, lines in out.items()}
+    return issues, fixes
+
+def main():
+    ap = argparse.ArgumentParser(description="Bulk-validate YOLO label files.")
+    ap.add_argument("--root", default="/home/ostikar/MyProjects/CS541/ClashRoyale/data",
+                    help="Searched recursively for labels/ folders.")
+    ap.add_argument("--data", default="data.yaml", help="data.yaml with class names.")
+    ap.add_argument("--report", default="label_report.jsonl", help="Machine-readable issue report.")
+    ap.add_argument("--fix", action="store_true", help="Rewrite files with issues repaired.")
+    ap.add_argument("--min-size", type=float, default=1e-4, help="Minimum normalized width/height.")
+    ap.add_argument("--dup-tol", type=float, default=1e-4, help="Coordinate tolerance for duplicates.")
+    ap.add_argument("--overlap-iou", type=float, default=0.7, help="Same-class IoU reported as overlap.")
+    ap.add_argument("--chunk", type=int, default=2000, help="Files per worker task.")
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    n_classes = len(yaml.safe_load(Path(args.data).read_text())['names'])
+    files = find_label_files(Path(args.root))
+    print(f"[INFO] Found {len(files)} label files under {args.root} ({time.perf_counter() - t0:.1f}s)")
+
+    counts = Counter()
+    bad_files = set()
+    fixed = 0
+    jobs = [(files[i:i + args.chunk], n_classes, args.min_size, args.dup_tol, args.overlap_iou, args.fix)
+            for i in range(0, len(files), args.chunk)]
+    with open(args.report, 'w') as rep, ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for issues, fixes in pool.map(check_chunk, jobs):
+            for issue in issues:
+                counts[issue['issue']] += 1
+                bad_files.add(issue['file'])
+                rep.write(json.dumps(issue) + '\n')
+            for f, text in fixes.items():
+                Path(f).write_text(text)
+                fixed += 1
+
+    print(f"\n{'='*60}")
+    print(f"Label files checked: {len(files)}")
+    print(f"Files with issues:   {len(bad_files)}")
+    for name in ISSUES:
+        print(f"  {name:<14} {counts[name]}")
+    if args.fix:
+        print(f"Files rewritten:     {fixed}")
+    print(f"Report: {args.report}")
+    print(f"Elapsed: {time.perf_counter() - t0:.1f}s")
+    print(f"{'='*60}")
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,30 @@
-import cv2
+import argparse
+from multiprocessing import Pool
 from pathlib import Path
 import random
+import struct
+
+from image_meta import image_size
 
 # Paths
 DATA_DIR = Path("/home/ostikar/MyProjects/CS541/ClashRoyale/data/arena_05/game_2")
 IMG_DIR = DATA_DIR / "images"
 LBL_DIR = DATA_DIR / "labels"
 OUTPUT_DIR = DATA_DIR / "visualizations"
-OUTPUT_DIR.mkdir(exist_ok=True)
 
 # Class names and colors
-CLASS_NAMES = {0: "king_tower", 1: "princess_tower"}
+CLASS_NAMES = {0: "king_tower", 1: "princess_tower", 2: "level_badge", 3: "health_text", 4: "health_bar"}
 CLASS_COLORS = {
     0: (0, 255, 255),     # Yellow for king towers
-    1: (255, 0, 255)      # Magenta for princess towers
+    1: (255, 0, 255),     # Magenta for princess towers
+    2: (255, 255, 0),     # Cyan for level badges
+    3: (255, 128, 0),     # Blue for health text
+    4: (0, 255, 0)        # Green for health bars
 }
+# Label-diff overlay colors
+PRED_COLOR = (255, 255, 255)   # White for predictions
+MISS_COLOR = (0, 0, 255)       # Red for ground truth with no matching prediction
+FP_COLOR = (0, 128, 255)       # Orange for predictions with no matching ground truth
 
 def yolo_to_bbox(yolo_coords, img_w, img_h):
     """Convert YOLO format (cx, cy, w, h) to (x1, y1, x2, y2)"""
@@ -27,6 +37,8 @@ def yolo_to_bbox(yolo_coords, img_w, img_h):
 
 def visualize_image(img_path, label_path, save_path):
     """Visualize single image with bounding boxes"""
+    import cv2
+
     # Read image
     img = cv2.imread(str(img_path))
     if img is None:
@@ -99,6 +111,7 @@ def main(num_samples=None, random_sample=True):
     
     print(f"Visualizing {len(image_files)} images...")
     print(f"Saving to: {OUTPUT_DIR}")
+    OUTPUT_DIR.mkdir(exist_ok=True)
     
     success_count = 0
     for img_path in image_files:
@@ -117,10 +130,192 @@ def main(num_samples=None, random_sample=True):
     print("\n🎨 Color Legend:")
     print("   Yellow (0, 255, 255) = King Tower")
     print("   Magenta (255, 0, 255) = Princess Tower")
+    print("   Green (0, 255, 0) = Health Bar")
+
+def read_boxes(label_path):
+    """Read YOLO boxes as a list of (class_id, cx, cy, w, h); extra columns (conf) are ignored"""
+    if label_path is None or not label_path.exists():
+        return []
+    boxes = []
+    for line in label_path.read_text().splitlines():
+        parts = line.strip().split()
+        if len(parts) < 5:
+            continue
+        boxes.append((int(parts[0]), *map(float, parts[1:5])))
+    return boxes
+
+def box_iou(a, b):
+    """IoU of two (x1, y1, x2, y2) boxes"""
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+def draw_boxes(img, boxes, color_fn, thickness, with_text):
+    import cv2
+
+    h, w = img.shape[:2]
+    for class_id, cx, cy, bw, bh in boxes:
+        x1, y1, x2, y2 = yolo_to_bbox([cx, cy, bw, bh], w, h)
+        color = color_fn(class_id)
+        cv2.rectangle(img, (x1, y1), (x2, y2), color, thickness)
+        if with_text:
+            cv2.putText(img, CLASS_NAMES.get(class_id, f"class_{class_id}"), (x1, max(0, y1 - 2)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1)
+
+def render_frame(task):
+    """
+    Worker: decode one frame, draw labels (and the prediction diff if given)
+    and return it resized to the output size.
+    task = (img_path, gt_path, pred_path, (out_w, out_h), iou_thr)
+    """
+    import cv2
+    import numpy as np
+
+    img_path, gt_path, pred_path, size, iou_thr = task
+    img = cv2.imread(str(img_path))
+    if img is None:
+        return np.zeros((size[1], size[0], 3), dtype=np.uint8)
+    img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+    w, h = size
+    gt = read_boxes(gt_path)
+
+    if pred_path is None:
+        draw_boxes(img, gt, lambda c: CLASS_COLORS.get(c, (0, 255, 0)), 2, True)
+    else:
+        pred = read_boxes(pred_path)
+        gt_xy = [yolo_to_bbox(b[1:], w, h) for b in gt]
+        pred_xy = [yolo_to_bbox(b[1:], w, h) for b in pred]
+        # Greedy same-class matching, ground truth vs predictions
+        matched_gt, matched_pred = set(), set()
+        for i, g in enumerate(gt):
+            best, best_j = iou_thr, None
+            for j, p in enumerate(pred):
+                if j in matched_pred or p[0] != g[0]:
+                    continue
+                iou = box_iou(gt_xy[i], pred_xy[j])
+                if iou >= best:
+                    best, best_j = iou, j
+            if best_j is not None:
+                matched_gt.add(i); matched_pred.add(best_j)
+        draw_boxes(img, [b for i, b in enumerate(gt) if i in matched_gt],
+                   lambda c: CLASS_COLORS.get(c, (0, 255, 0)), 2, False)
+        draw_boxes(img, [b for j, b in enumerate(pred) if j in matched_pred], lambda c: PRED_COLOR, 1, False)
+        draw_boxes(img, [b for i, b in enumerate(gt) if i not in matched_gt], lambda c: MISS_COLOR, 2, True)
+        draw_boxes(img, [b for j, b in enumerate(pred) if j not in matched_pred], lambda c: FP_COLOR, 2, True)
+
+    cv2.putText(img, f"{img_path.parent.parent.name}/{img_path.stem}", (4, h - 6),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+    return img
+
+def collect_game(game_dir):
+    images = sorted(list((game_dir / "images").glob("*.jpg")) + list((game_dir / "images").glob("*.png")))
+    return [(p, game_dir / "labels" / f"{p.stem}.txt") for p in images]
+
+def collect_sample(data_root, n, seed):
+    """Random sample of frames across all arena_*/game_* folders"""
+    pairs = []
+    for game_dir in sorted(data_root.glob("arena_*/game_*")):
+        pairs.extend(collect_game(game_dir))
+    random.seed(seed)
+    return random.sample(pairs, n) if n < len(pairs) else pairs
+
+def pred_path_for(img_path, pred_dir, per_game=False):
+    """
+    Prediction txt for a frame. Frame names repeat across games, so with
+    per_game the predictions are looked up as <pred_dir>/<arena>/<game>/labels
+    (inference.py --root-mode layout); otherwise pred_dir is one game's labels.
+    """
+    if per_game:
+        game = img_path.parent.parent
+        return pred_dir / game.parent.name / game.name / "labels" / f"{img_path.stem}.txt"
+    return pred_dir / f"{img_path.stem}.txt"
+
+def render(pairs, out_path, pred_dir=None, mode="video", width=360, fps=30, cols=8,
+           workers=8, iou_thr=0.5, per_game=False):
+    """
+    Stream frames through a worker pool into one mp4 or one grid contact sheet.
+    Unreadable frames are skipped; returns the number of frames rendered.
+    """
+    import cv2
+    import numpy as np
+
+    first = None
+    readable = []
+    for img, lbl in pairs:
+        try:
+            W, H = image_size(img)
+        except (OSError, ValueError, struct.error):
+            print(f"[WARN] Skipping unreadable frame {img}")
+            continue
+        first = first or (W, H)
+        readable.append((img, lbl))
+    if not readable:
+        return 0
+    height = int(round(first[1] * width / first[0]))
+    size = (width, height)
+    tasks = [(img, lbl, pred_path_for(img, pred_dir, per_game) if pred_dir else None, size, iou_thr)
+             for img, lbl in readable]
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with Pool(workers) as pool:
+        frames = pool.imap(render_frame, tasks, chunksize=16)
+        if mode == "video":
+            writer = cv2.VideoWriter(str(out_path), cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+            for frame in frames:
+                writer.write(frame)
+            writer.release()
+        else:
+            rows = (len(tasks) + cols - 1) // cols
+            sheet = np.zeros((rows * height, cols * width, 3), dtype=np.uint8)
+            for k, frame in enumerate(frames):
+                r, c = divmod(k, cols)
+                sheet[r * height:(r + 1) * height, c * width:(c + 1) * width] = frame
+            cv2.imwrite(str(out_path), sheet)
+    return len(tasks)
+
+def cli():
+    ap = argparse.ArgumentParser(description="Render labels/predictions into one mp4 or contact sheet.")
+    src = ap.add_mutually_exclusive_group()
+    src.add_argument("--game", help="Game folder with images/ and labels/ (renders every frame in order).")
+    src.add_argument("--sample", type=int, help="Random sample of N frames across arenas under --root.")
+    ap.add_argument("--root", default="/home/ostikar/MyProjects/CS541/ClashRoyale/data",
+                    help="Data root containing arena_* folders (used with --sample).")
+    ap.add_argument("--pred-dir", default=None,
+                    help="Predicted YOLO txts for a diff overlay: the game's labels folder with --game, "
+                         "or the inference.py --root-mode output (<arena>/<game>/labels) with --sample.")
+    ap.add_argument("--mode", choices=["video", "grid"], default="video")
+    ap.add_argument("--out", default=None, help="Output .mp4 (video) or .jpg/.png (grid).")
+    ap.add_argument("--width", type=int, default=360, help="Output width per frame/tile.")
+    ap.add_argument("--fps", type=int, default=30)
+    ap.add_argument("--cols", type=int, default=8, help="Grid columns.")
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--iou", type=float, default=0.5, help="IoU to match predictions to ground truth.")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    if not args.game and not args.sample:
+        # Per-image JPEGs for DATA_DIR, as before
+        main(num_samples=10, random_sample=True)
+        return
+    if not args.out:
+        ap.error("--out is required with --game/--sample")
+
+    if args.game:
+        pairs = collect_game(Path(args.game))
+    else:
+        pairs = collect_sample(Path(args.root), args.sample, args.seed)
+    if not pairs:
+        print("No images found")
+        return
+
+    n = render(pairs, Path(args.out), Path(args.pred_dir) if args.pred_dir else None, args.mode,
+               args.width, args.fps, args.cols, args.workers, args.iou, per_game=bool(args.sample))
+    print(f"✅ Rendered {n} frames to {args.out}")
+    if args.pred_dir:
+        print("🎨 Diff legend: class color = matched GT, white = matched prediction, "
+              "red = missed GT, orange = false positive")
 
 if __name__ == "__main__":
-    # Visualize all images
-    main(num_samples=10, random_sample=True)
-    
-    # Or visualize just 10 random samples:
-    # main(num_samples=10, random_sample=True)
\ No newline at end of file
+    cli()